@@ -1,212 +1,246 @@
 from __future__ import annotations
 
-import os
-import subprocess
-import tempfile
+import logging
+import math
+import queue
+import sqlite3
+import threading
 import time
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
+from . import asr_cache
+from .asr_engines import AsrResult, get_engine, worker_slot
+from .audio import DecodedAudio, decode_audio, detect_speech_onset, quietest_point
 from .config import RuntimeSettings
+from .probe import AudioInfo, safe_probe_audio
+
+logger = logging.getLogger(__name__)
+
+StageCallback = Callable[[str], None]
+ConfidenceFn = Callable[[str], float]
+
+# Prefix lengths tried by the `adaptive` scope, and the confidence that ends the
+# search early (the same bar below which services flags a record for review).
+ADAPTIVE_STEPS_SEC = (4, 8, 16)
+ADAPTIVE_MIN_CONFIDENCE = 0.75
+
+
+def preload_model(settings: RuntimeSettings) -> None:
+    """Load and warm up the configured model for the calling worker's slot."""
+    engine = get_engine(settings.asr_engine)
+    if engine.capabilities.local:
+        engine.load(settings)
+
+
+def preload_models(settings: RuntimeSettings) -> None:
+    """Startup preload into the shared slot; failures are logged, not raised."""
+    engine = get_engine(settings.asr_engine)
+    if not engine.capabilities.local or not settings.whisper_preload:
+        return
+    # WHISPER_PRELOAD names the whisper_local models; other engines have a single model.
+    names: tuple[str | None, ...] = settings.whisper_preload if engine.name == "whisper_local" else (None,)
+    for name in names:
+        try:
+            engine.load(settings, name)
+        except Exception:
+            logger.exception("Failed to preload %s model %s", engine.name, name or engine.model_id(settings))
+
+
+def model_status(settings: RuntimeSettings) -> dict[str, Any]:
+    engine = get_engine(settings.asr_engine)
+    registry = engine.registry(settings)
+    status = registry.status() if registry is not None else {"models": []}
+    status["engine"] = engine.name
+    status["capabilities"] = asdict(engine.capabilities)
+    status["stats"] = engine.stats()
+    return status
+
+
+def transcribe_audio(
+    audio_path: Path,
+    settings: RuntimeSettings,
+    audio: DecodedAudio | None = None,
+) -> AsrResult:
+    """Transcribe `audio` when given (already decoded PCM), otherwise the file at `audio_path`."""
+    return get_engine(settings.asr_engine).transcribe(audio_path, settings, audio)
 
 
 @dataclass
-class AsrResult:
-    engine: str
-    text: str
-    lang: str
-    segments: list[dict[str, Any]]
-    duration_sec: float
+class _BatchItem:
+    clip: DecodedAudio
+    settings: RuntimeSettings
+    done: threading.Event
+    result: AsrResult | None = None
+    error: BaseException | None = None
+
+
+class _HeadBatcher:
+    """Collects head clips from concurrent pool workers and decodes them as one mel batch.
+
+    The first clip to arrive opens a batch; it closes after `ASR_BATCH_MAX` clips
+    or `ASR_BATCH_WAIT_MS`, whichever comes first, so no clip waits longer than
+    that before decoding starts. Engines decode a batch on their shared model.
+    """
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue[_BatchItem] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "clips": 0, "max_batch": 0}
+
+    def transcribe(self, clip: DecodedAudio, settings: RuntimeSettings) -> AsrResult:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="asr-batcher", daemon=True)
+                self._thread.start()
+        item = _BatchItem(clip=clip, settings=settings, done=threading.Event())
+        self._queue.put(item)
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        assert item.result is not None
+        return item.result
+
+    def _collect(self) -> list[_BatchItem]:
+        first = self._queue.get()
+        batch = [first]
+        deadline = time.monotonic() + first.settings.asr_batch_wait_ms / 1000.0
+        while len(batch) < first.settings.asr_batch_max:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            groups: dict[tuple[str, str, str], list[_BatchItem]] = {}
+            for item in batch:
+                engine = get_engine(item.settings.asr_engine)
+                key = (engine.name, engine.model_id(item.settings), item.settings.whisper_language)
+                groups.setdefault(key, []).append(item)
+            for items in groups.values():
+                try:
+                    settings = items[0].settings
+                    results = get_engine(settings.asr_engine).transcribe_batch([item.clip for item in items], settings)
+                    for item, result in zip(items, results):
+                        item.result = result
+                except Exception as exc:
+                    for item in items:
+                        item.error = exc
+                finally:
+                    for item in items:
+                        item.done.set()
+                with self._lock:
+                    self._stats["batches"] += 1
+                    self._stats["clips"] += len(items)
+                    self._stats["max_batch"] = max(self._stats["max_batch"], len(items))
 
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["mean_batch"] = round(stats["clips"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
 
-_WHISPER_MODEL_CACHE: dict[str, Any] = {}
 
+_HEAD_BATCHER = _HeadBatcher()
 
-def _duration_from_segments(segments: list[dict[str, Any]]) -> float:
-    if not segments:
-        return 0.0
-    return max(float(seg.get("t1", 0.0) or 0.0) for seg in segments)
 
+def batch_stats() -> dict[str, Any]:
+    return _HEAD_BATCHER.stats()
 
-def _normalize_segments(raw_segments: Any) -> list[dict[str, Any]]:
-    segments: list[dict[str, Any]] = []
-    if not raw_segments:
-        return segments
-
-    def _pick(seg_obj: Any, *keys: str, default: Any = None) -> Any:
-        for key in keys:
-            if isinstance(seg_obj, dict) and key in seg_obj:
-                return seg_obj[key]
-            if hasattr(seg_obj, key):
-                return getattr(seg_obj, key)
-        return default
-
-    for seg in raw_segments:
-        t0 = float(_pick(seg, "start", "t0", default=0.0) or 0.0)
-        t1 = float(_pick(seg, "end", "t1", default=0.0) or 0.0)
-        text = str(_pick(seg, "text", default="") or "").strip()
-        segments.append({"t0": t0, "t1": t1, "text": text})
-    return segments
-
-
-def _asr_whisper_local(audio_path: Path, settings: RuntimeSettings) -> AsrResult:
-    try:
-        import whisper  # type: ignore[import-not-found]
-    except ImportError as exc:
-        raise RuntimeError(
-            "ASR_ENGINE=whisper_local 但未安装 openai-whisper。请安装依赖或切换 ASR_ENGINE=stub/openai_api。"
-        ) from exc
-
-    model = _WHISPER_MODEL_CACHE.get(settings.whisper_model)
-    if model is None:
-        model = whisper.load_model(settings.whisper_model)
-        _WHISPER_MODEL_CACHE[settings.whisper_model] = model
-
-    data = model.transcribe(
-        str(audio_path),
-        language=settings.whisper_language or None,
-        verbose=False,
-        task="transcribe",
-        fp16=False,
-    )
-    text = str(data.get("text", "")).strip()
-    segments = _normalize_segments(data.get("segments", []))
-    lang = str(data.get("language", settings.whisper_language)).strip() or settings.whisper_language
-    duration_sec = _duration_from_segments(segments)
-    return AsrResult(engine="whisper_local", text=text, lang=lang, segments=segments, duration_sec=duration_sec)
 
+def _transcribe_head(audio_path: Path, settings: RuntimeSettings, clip: DecodedAudio) -> AsrResult:
+    # Batching only pays off when several pool workers produce head clips at once.
+    capabilities = get_engine(settings.asr_engine).capabilities
+    if (
+        capabilities.batch
+        and settings.asr_batch_max > 1
+        and settings.scan_workers > 1
+        and worker_slot() > 0
+        and clip.duration_sec <= capabilities.max_batch_clip_sec
+    ):
+        return _HEAD_BATCHER.transcribe(clip, settings)
+    return transcribe_audio(audio_path, settings, clip)
 
-def _asr_openai_api(audio_path: Path, settings: RuntimeSettings) -> AsrResult:
-    try:
-        from openai import OpenAI  # type: ignore[import-not-found]
-    except ImportError as exc:
-        raise RuntimeError("ASR_ENGINE=openai_api 但未安装 openai SDK。") from exc
-
-    if not settings.openai_api_key:
-        raise RuntimeError("ASR_ENGINE=openai_api 需要设置 OPENAI_API_KEY。")
-
-    client = OpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url)
-    with audio_path.open("rb") as file_obj:
-        response = client.audio.transcriptions.create(
-            model=settings.openai_model,
-            file=file_obj,
-            response_format="verbose_json",
-            language=settings.whisper_language,
-        )
-
-    if hasattr(response, "model_dump"):
-        payload = response.model_dump()
-    elif isinstance(response, dict):
-        payload = response
-    else:
-        payload = {"text": str(response)}
-
-    text = str(payload.get("text", "")).strip()
-    lang = str(payload.get("language", settings.whisper_language)).strip() or settings.whisper_language
-    segments = _normalize_segments(payload.get("segments", []))
-    duration_sec = float(payload.get("duration", 0.0) or _duration_from_segments(segments))
-    return AsrResult(engine="openai_api", text=text, lang=lang, segments=segments, duration_sec=duration_sec)
-
-
-def _asr_stub(audio_path: Path) -> AsrResult:
-    text = audio_path.stem
-    return AsrResult(
-        engine="stub",
-        text=text,
-        lang="zh",
-        segments=[{"t0": 0.0, "t1": 0.0, "text": text}],
-        duration_sec=0.0,
-    )
+
+def _full_pass_audio(audio: DecodedAudio | None, settings: RuntimeSettings) -> DecodedAudio | None:
+    # Local engines would decode the file again on their own; API engines are better
+    # served by uploading the original (compressed) file.
+    return audio if get_engine(settings.asr_engine).capabilities.accepts_pcm else None
+
+
+def _chunk_bounds(audio: DecodedAudio, chunk_sec: int) -> list[tuple[float, float]]:
+    """Near-equal chunks of at most about `chunk_sec`, cut at the quietest nearby frame."""
+    count = math.ceil(audio.duration_sec / chunk_sec)
+    step = audio.duration_sec / count
+    cuts = [0.0] + [quietest_point(audio, step * n) for n in range(1, count)] + [audio.duration_sec]
+    return list(zip(cuts[:-1], cuts[1:]))
 
 
-def transcribe_audio(audio_path: Path, settings: RuntimeSettings) -> AsrResult:
-    if settings.asr_engine == "whisper_local":
-        return _asr_whisper_local(audio_path, settings)
-    if settings.asr_engine == "openai_api":
-        return _asr_openai_api(audio_path, settings)
-    return _asr_stub(audio_path)
+def _full_pass(audio_path: Path, settings: RuntimeSettings, audio: DecodedAudio | None) -> tuple[AsrResult, int]:
+    """Full transcription and the number of chunks it was split into.
 
+    Recordings longer than ASR_CHUNK_SEC are transcribed chunk by chunk from the
+    decoded PCM, which bounds model memory and keeps API uploads under size
+    limits; segments are shifted back onto the original timeline.
+    """
+    chunk_sec = settings.asr_chunk_sec
+    if audio is None or chunk_sec <= 0 or audio.duration_sec <= chunk_sec:
+        return transcribe_audio(audio_path, settings, _full_pass_audio(audio, settings)), 1
 
-def tagging_text(asr_result: AsrResult, window_sec: int) -> str:
+    bounds = _chunk_bounds(audio, chunk_sec)
+    texts: list[str] = []
+    segments: list[dict[str, Any]] = []
+    lang = ""
+    engine = settings.asr_engine
+    for start, end in bounds:
+        part = transcribe_audio(audio_path, settings, audio.slice(start, end))
+        engine, lang = part.engine, lang or part.lang
+        if part.text.strip():
+            texts.append(part.text.strip())
+        for seg in part.segments:
+            shifted = dict(seg)
+            shifted["t0"] = round(float(seg.get("t0", 0.0) or 0.0) + start, 3)
+            shifted["t1"] = round(float(seg.get("t1", 0.0) or 0.0) + start, 3)
+            segments.append(shifted)
+    result = AsrResult(engine=engine, text=" ".join(texts), lang=lang, segments=segments, duration_sec=audio.duration_sec)
+    return result, len(bounds)
+
+
+def tagging_text(asr_result: AsrResult, window_sec: int, start_sec: float = 0.0) -> str:
+    """Text of the segments overlapping [start_sec, start_sec + window_sec]."""
     if window_sec <= 0:
         return asr_result.text.strip()
     if not asr_result.segments:
         return asr_result.text.strip()
 
+    window_end = start_sec + window_sec
     snippets: list[str] = []
     for seg in asr_result.segments:
         t0 = float(seg.get("t0", 0.0) or 0.0)
         t1 = float(seg.get("t1", 0.0) or 0.0)
-        if t0 <= window_sec:
+        if t1 < start_sec:
+            continue
+        if t0 <= window_end:
             text = str(seg.get("text", "")).strip()
             if text:
                 snippets.append(text)
-        if t1 >= window_sec:
+        if t1 >= window_end:
             break
 
     head_text = " ".join(snippets).strip()
     return head_text or asr_result.text.strip()
 
 
-def _has_ffmpeg() -> bool:
-    return bool(shutil_which("ffmpeg"))
-
-
-def shutil_which(binary: str) -> str | None:
-    # Local wrapper to keep imports minimal and explicit.
-    from shutil import which
-
-    return which(binary)
-
-
-def extract_head_clip(audio_path: Path, window_sec: int) -> Path | None:
-    if window_sec <= 0 or not _has_ffmpeg():
-        return None
-
-    fd, tmp_path = tempfile.mkstemp(prefix="asr_head_", suffix=".wav")
-    os.close(fd)
-    out = Path(tmp_path)
-    cmd = [
-        "ffmpeg",
-        "-y",
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-i",
-        str(audio_path),
-        "-t",
-        str(window_sec),
-        "-vn",
-        "-ac",
-        "1",
-        "-ar",
-        "16000",
-        str(out),
-    ]
-
-    proc = subprocess.run(cmd, capture_output=True, text=True)
-    if proc.returncode != 0:
-        out.unlink(missing_ok=True)
-        return None
-    return out
-
-
 def transcribe_with_head_window(audio_path: Path, settings: RuntimeSettings) -> tuple[AsrResult, str]:
-    full = transcribe_audio(audio_path, settings)
-    head_text = tagging_text(full, settings.asr_tag_window_sec)
-
-    clip_path = extract_head_clip(audio_path, settings.asr_tag_window_sec)
-    if clip_path is None:
-        return full, head_text
-
-    try:
-        head_result = transcribe_audio(clip_path, settings)
-        if head_result.text.strip():
-            head_text = head_result.text.strip()
-    finally:
-        clip_path.unlink(missing_ok=True)
-
+    full, head_text, _ = transcribe_for_scope(audio_path, settings, scope="hybrid")
     return full, head_text
 
 
@@ -214,81 +248,240 @@ def transcribe_for_scope(
     audio_path: Path,
     settings: RuntimeSettings,
     scope: str = "full",
+    on_stage: StageCallback | None = None,
+    tag_confidence: ConfidenceFn | None = None,
+    info: AudioInfo | None = None,
+    probed: bool = False,
+    audio_sha256: str | None = None,
 ) -> tuple[AsrResult, str, dict[str, Any]]:
+    """Transcribe for the given scope; `on_stage` is told when each stage starts.
+
+    The `adaptive` scope needs `tag_confidence(text)` to decide when a prefix is
+    long enough; without it every step falls through to the full pass. `info`
+    is the header probe of the file; pass `probed=True` with it, even when it is
+    None, so the file is not probed a second time. `audio_sha256` saves hashing
+    a file whose hash the caller already has.
+    """
     normalized_scope = scope.strip().lower()
-    if normalized_scope not in {"full", "head", "hybrid"}:
+    if normalized_scope not in {"full", "head", "hybrid", "adaptive"}:
         normalized_scope = "full"
 
+    if settings.asr_engine == "stub" or settings.asr_cache_max_mb <= 0:
+        return _transcribe_for_scope(audio_path, settings, normalized_scope, on_stage, tag_confidence, info, probed)
+
+    t_start = time.perf_counter()
+    key: str | None = None
+    try:
+        key = asr_cache.cache_key(audio_sha256 or asr_cache.file_sha256(audio_path), settings, normalized_scope)
+        cached = asr_cache.get(key)
+    except (sqlite3.Error, OSError):
+        logger.warning("ASR cache lookup failed: %s", audio_path, exc_info=True)
+        cached = None
+    lookup_ms = round((time.perf_counter() - t_start) * 1000, 2)
+
+    if cached is not None:
+        debug = dict(cached["debug"])
+        debug["cache"] = "hit"
+        debug["timing_ms"] = {"cache_lookup": lookup_ms, "total": lookup_ms}
+        return AsrResult(**cached["result"]), str(cached["head_text"]), debug
+
+    result, head_text, debug = _transcribe_for_scope(audio_path, settings, normalized_scope, on_stage, tag_confidence, info, probed)
+    if key is not None:
+        try:
+            asr_cache.put(
+                key,
+                {"result": asdict(result), "head_text": head_text, "debug": debug},
+                settings.asr_cache_max_mb,
+            )
+        except sqlite3.Error:
+            logger.warning("ASR cache store failed: %s", audio_path, exc_info=True)
+    debug["cache"] = "miss"
+    debug["timing_ms"]["cache_lookup"] = lookup_ms
+    return result, head_text, debug
+
+
+def _transcribe_for_scope(
+    audio_path: Path,
+    settings: RuntimeSettings,
+    normalized_scope: str,
+    on_stage: StageCallback | None = None,
+    tag_confidence: ConfidenceFn | None = None,
+    info: AudioInfo | None = None,
+    probed: bool = False,
+) -> tuple[AsrResult, str, dict[str, Any]]:
+    def stage(name: str) -> None:
+        if on_stage is not None:
+            on_stage(name)
+
     t_start = time.perf_counter()
     timing_ms: dict[str, float] = {}
     used_head_clip = False
     fallback_to_full = False
     clip_eligible = settings.asr_engine != "stub"
+    window_sec = settings.asr_tag_window_sec
+
+    # The header probe routes the file before anything is decoded: a clip no
+    # longer than the tag window needs no separate head pass, and a recording
+    # longer than ASR_CHUNK_SEC is decoded so the full pass can be chunked.
+    if not probed and clip_eligible:
+        t_probe_start = time.perf_counter()
+        info = safe_probe_audio(audio_path)
+        timing_ms["probe"] = round((time.perf_counter() - t_probe_start) * 1000, 2)
+    duration_sec = info.duration_sec if info is not None else None
+    short_clip = duration_sec is not None and duration_sec <= window_sec
+    long_file = duration_sec is not None and 0 < settings.asr_chunk_sec < duration_sec
+    route = "short" if short_clip else "long" if long_file else "standard"
+
+    # Decode once; the full pass and the head pass are both fed from this buffer.
+    audio: DecodedAudio | None = None
+    needs_pcm = (
+        normalized_scope in {"head", "adaptive"}
+        or (normalized_scope == "hybrid" and not short_clip)
+        or settings.asr_tag_vad
+        or long_file
+        or get_engine(settings.asr_engine).capabilities.accepts_pcm
+    )
+    # A long file is decoded even with the tag window off, or it would skip chunking.
+    if clip_eligible and needs_pcm and (window_sec > 0 or long_file):
+        stage("decode")
+        t_decode_start = time.perf_counter()
+        audio = decode_audio(audio_path)
+        timing_ms["decode"] = round((time.perf_counter() - t_decode_start) * 1000, 2)
+    # Head passes need a window; with ASR_TAG_WINDOW_SEC=0 the buffer only feeds the full pass.
+    head_audio = audio if window_sec > 0 else None
+
+    # The head window starts at the first speech instead of at 0 when VAD is on.
+    speech_onset_sec: float | None = None
+    head_start = 0.0
+    if settings.asr_tag_vad and head_audio is not None:
+        stage("vad")
+        t_vad_start = time.perf_counter()
+        speech_onset_sec = detect_speech_onset(head_audio)
+        timing_ms["vad"] = round((time.perf_counter() - t_vad_start) * 1000, 2)
+        head_start = speech_onset_sec or 0.0
 
     if normalized_scope == "hybrid":
+        stage("asr_full")
         t_full_start = time.perf_counter()
-        full = transcribe_audio(audio_path, settings)
+        full, chunks = _full_pass(audio_path, settings, audio)
         timing_ms["asr_full"] = round((time.perf_counter() - t_full_start) * 1000, 2)
-        head_text = tagging_text(full, settings.asr_tag_window_sec)
+        head_text = tagging_text(full, window_sec, head_start)
 
-        if clip_eligible:
+        if head_audio is not None and head_audio.duration_sec > head_start + window_sec:
+            stage("head_clip")
             t_clip_start = time.perf_counter()
-            clip_path = extract_head_clip(audio_path, settings.asr_tag_window_sec)
+            clip = head_audio.slice(head_start, head_start + window_sec)
             timing_ms["head_clip"] = round((time.perf_counter() - t_clip_start) * 1000, 2)
-            used_head_clip = clip_path is not None
-            if clip_path is not None:
-                try:
-                    t_head_start = time.perf_counter()
-                    head = transcribe_audio(clip_path, settings)
-                    timing_ms["asr_head"] = round((time.perf_counter() - t_head_start) * 1000, 2)
-                    if head.text.strip():
-                        head_text = head.text.strip()
-                finally:
-                    clip_path.unlink(missing_ok=True)
+            used_head_clip = True
+            stage("asr_head")
+            t_head_start = time.perf_counter()
+            head = _transcribe_head(audio_path, settings, clip)
+            timing_ms["asr_head"] = round((time.perf_counter() - t_head_start) * 1000, 2)
+            if head.text.strip():
+                head_text = head.text.strip()
         else:
+            # The head window would be the whole clip: the full pass already covers it.
             timing_ms["head_clip"] = 0.0
+            if head_audio is not None:
+                route = "short"
 
         timing_ms["total"] = round((time.perf_counter() - t_start) * 1000, 2)
         return full, head_text, {
             "scope": normalized_scope,
             "used_head_clip": used_head_clip,
             "fallback_to_full": fallback_to_full,
+            "speech_onset_sec": speech_onset_sec,
+            "route": route,
+            "chunks": chunks,
             "timing_ms": timing_ms,
         }
 
-    if normalized_scope == "head":
-        if clip_eligible:
-            t_clip_start = time.perf_counter()
-            clip_path = extract_head_clip(audio_path, settings.asr_tag_window_sec)
-            timing_ms["head_clip"] = round((time.perf_counter() - t_clip_start) * 1000, 2)
-            used_head_clip = clip_path is not None
-
-            if clip_path is not None:
-                try:
-                    t_asr_start = time.perf_counter()
-                    head = transcribe_audio(clip_path, settings)
-                    timing_ms["asr"] = round((time.perf_counter() - t_asr_start) * 1000, 2)
+    if normalized_scope == "adaptive":
+        if head_audio is not None:
+            steps: list[dict[str, Any]] = []
+            remaining = head_audio.duration_sec - head_start
+            for step_sec in ADAPTIVE_STEPS_SEC:
+                stage("asr_head")
+                t_step_start = time.perf_counter()
+                head = _transcribe_head(audio_path, settings, head_audio.slice(head_start, head_start + step_sec))
+                timing_ms[f"asr_head_{step_sec}s"] = round((time.perf_counter() - t_step_start) * 1000, 2)
+                used_head_clip = True
+                text = head.text.strip()
+                confidence = tag_confidence(text) if tag_confidence is not None and text else 0.0
+                covers_rest = step_sec >= remaining
+                steps.append({"window_sec": step_sec, "confidence": round(confidence, 4)})
+                # A prefix that already reaches the end is the full transcript, so a
+                # low score there has nothing left to fall back to.
+                if confidence >= ADAPTIVE_MIN_CONFIDENCE or covers_rest:
                     timing_ms["total"] = round((time.perf_counter() - t_start) * 1000, 2)
-                    return head, head.text.strip(), {
+                    return head, text, {
                         "scope": normalized_scope,
                         "used_head_clip": used_head_clip,
-                        "fallback_to_full": fallback_to_full,
+                        "fallback_to_full": False,
+                        "low_confidence": confidence < ADAPTIVE_MIN_CONFIDENCE,
+                        "speech_onset_sec": speech_onset_sec,
+                        "route": route,
+                        "chunks": 0,
+                        "adaptive_steps": steps,
                         "timing_ms": timing_ms,
                     }
-                finally:
-                    clip_path.unlink(missing_ok=True)
 
-        timing_ms["head_clip"] = timing_ms.get("head_clip", 0.0)
+            stage("asr_full")
+            t_asr_start = time.perf_counter()
+            full, chunks = _full_pass(audio_path, settings, audio)
+            timing_ms["asr_full"] = round((time.perf_counter() - t_asr_start) * 1000, 2)
+            timing_ms["total"] = round((time.perf_counter() - t_start) * 1000, 2)
+            return full, tagging_text(full, window_sec, head_start), {
+                "scope": normalized_scope,
+                "used_head_clip": used_head_clip,
+                "fallback_to_full": True,
+                "low_confidence": True,
+                "speech_onset_sec": speech_onset_sec,
+                "route": route,
+                "chunks": chunks,
+                "adaptive_steps": steps,
+                "timing_ms": timing_ms,
+            }
+
+        fallback_to_full = True
+
+    if normalized_scope == "head":
+        if head_audio is not None:
+            stage("head_clip")
+            t_clip_start = time.perf_counter()
+            clip = head_audio.slice(head_start, head_start + window_sec)
+            timing_ms["head_clip"] = round((time.perf_counter() - t_clip_start) * 1000, 2)
+            used_head_clip = True
+            stage("asr_head")
+            t_asr_start = time.perf_counter()
+            head = _transcribe_head(audio_path, settings, clip)
+            timing_ms["asr"] = round((time.perf_counter() - t_asr_start) * 1000, 2)
+            timing_ms["total"] = round((time.perf_counter() - t_start) * 1000, 2)
+            return head, head.text.strip(), {
+                "scope": normalized_scope,
+                "used_head_clip": used_head_clip,
+                "fallback_to_full": fallback_to_full,
+                "speech_onset_sec": speech_onset_sec,
+                "route": route,
+                "chunks": 0,
+                "timing_ms": timing_ms,
+            }
+
+        timing_ms["head_clip"] = 0.0
         fallback_to_full = True
 
+    stage("asr_full")
     t_asr_start = time.perf_counter()
-    full = transcribe_audio(audio_path, settings)
+    full, chunks = _full_pass(audio_path, settings, audio)
     timing_ms["asr"] = round((time.perf_counter() - t_asr_start) * 1000, 2)
-    head_text = tagging_text(full, settings.asr_tag_window_sec)
+    head_text = tagging_text(full, window_sec, head_start)
     timing_ms["total"] = round((time.perf_counter() - t_start) * 1000, 2)
     return full, head_text, {
         "scope": normalized_scope,
         "used_head_clip": used_head_clip,
         "fallback_to_full": fallback_to_full,
+        "speech_onset_sec": speech_onset_sec,
+        "route": route,
+        "chunks": chunks,
         "timing_ms": timing_ms,
     }
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from .asr_engines import get_engine
+from .config import ASR_CACHE_PATH, CACHE_DIR, MAPPINGS_PATH, RuntimeSettings
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# Inbox files are deleted once archived and takes get renamed, so hash rows for
+# vanished paths are dropped every FILE_HASH_PRUNE_EVERY writes; the oldest rows
+# go beyond FILE_HASH_MAX_ROWS.
+FILE_HASH_PRUNE_EVERY = 256
+FILE_HASH_MAX_ROWS = 50_000
+
+_DB_LOCK = threading.Lock()
+_DB: sqlite3.Connection | None = None
+_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+_HASH_WRITES = 0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS asr_cache (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_asr_cache_last_access ON asr_cache(last_access);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+"""
+
+
+def _db() -> sqlite3.Connection:
+    # Callers hold _DB_LOCK; one connection is shared by every thread.
+    global _DB
+    if _DB is None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(ASR_CACHE_PATH), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _DB = conn
+    return _DB
+
+
+def _stat_key(path: Path) -> tuple[str, int, int]:
+    resolved = path.resolve()
+    st = resolved.stat()
+    return str(resolved), st.st_size, st.st_mtime_ns
+
+
+def remember_file_hash(path: Path, sha256: str) -> None:
+    """Record a hash computed elsewhere (e.g. while streaming an upload)."""
+    global _HASH_WRITES
+    key_path, size, mtime_ns = _stat_key(path)
+    with _DB_LOCK:
+        conn = _db()
+        conn.execute(
+            "INSERT OR REPLACE INTO file_hashes(path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+            (key_path, size, mtime_ns, sha256),
+        )
+        conn.commit()
+        _HASH_WRITES += 1
+        due = _HASH_WRITES % FILE_HASH_PRUNE_EVERY == 0
+    if due:
+        prune_file_hashes()
+
+
+def prune_file_hashes(max_rows: int = FILE_HASH_MAX_ROWS) -> int:
+    """Drop hash rows of files that no longer exist, then the oldest beyond `max_rows`."""
+    with _DB_LOCK:
+        paths = [row[0] for row in _db().execute("SELECT path FROM file_hashes").fetchall()]
+    # Stat outside the lock so cache lookups are not held up; a row dropped by a
+    # race is simply hashed again.
+    stale = [(path,) for path in paths if not Path(path).exists()]
+    with _DB_LOCK:
+        conn = _db()
+        conn.executemany("DELETE FROM file_hashes WHERE path = ?", stale)
+        # INSERT OR REPLACE gives a row a new rowid, so rowid order is write order.
+        overflow = conn.execute(
+            "DELETE FROM file_hashes WHERE rowid IN "
+            "(SELECT rowid FROM file_hashes ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+            (max_rows,),
+        ).rowcount
+        conn.commit()
+    return len(stale) + max(0, overflow)
+
+
+def file_sha256(path: Path) -> str:
+    key_path, size, mtime_ns = _stat_key(path)
+    with _DB_LOCK:
+        row = _db().execute(
+            "SELECT sha256 FROM file_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (key_path, size, mtime_ns),
+        ).fetchone()
+    if row:
+        return str(row[0])
+
+    digest = hashlib.sha256()
+    with path.open("rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+    remember_file_hash(path, sha256)
+    return sha256
+
+
+def cache_key(audio_sha256: str, settings: RuntimeSettings, scope: str) -> str:
+    model = get_engine(settings.asr_engine).model_id(settings)
+    parts = [
+        audio_sha256,
+        settings.asr_engine,
+        model,
+        settings.whisper_language,
+        str(settings.asr_tag_window_sec),
+        # Chunk boundaries change what the full pass hears on long files.
+        str(settings.asr_chunk_sec),
+        scope,
+    ]
+    if settings.asr_tag_vad:
+        # The head window moves with the detected onset, so results differ.
+        parts.append("vad")
+    if scope == "adaptive":
+        # Where the adaptive scope stops depends on the tag confidence, which the
+        # synonyms in mappings.json decide.
+        parts.append(file_sha256(MAPPINGS_PATH))
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> dict[str, Any] | None:
+    with _DB_LOCK:
+        conn = _db()
+        row = conn.execute("SELECT payload FROM asr_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            _STATS["misses"] += 1
+            return None
+        conn.execute("UPDATE asr_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        conn.commit()
+        _STATS["hits"] += 1
+    return json.loads(row[0])
+
+
+def put(key: str, payload: dict[str, Any], max_mb: int) -> None:
+    if max_mb <= 0:
+        return
+    raw = json.dumps(payload, ensure_ascii=False)
+    size = len(raw.encode("utf-8"))
+    max_bytes = max_mb * 1024 * 1024
+    if size > max_bytes:
+        return
+
+    now = time.time()
+    with _DB_LOCK:
+        conn = _db()
+        conn.execute(
+            "INSERT OR REPLACE INTO asr_cache(key, payload, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+            (key, raw, size, now, now),
+        )
+        total = int(conn.execute("SELECT COALESCE(SUM(size), 0) FROM asr_cache").fetchone()[0])
+        if total > max_bytes:
+            # Evict least recently used entries until the cache fits again.
+            for old_key, old_size in conn.execute(
+                "SELECT key, size FROM asr_cache ORDER BY last_access ASC"
+            ).fetchall():
+                if total <= max_bytes:
+                    break
+                conn.execute("DELETE FROM asr_cache WHERE key = ?", (old_key,))
+                total -= int(old_size)
+                _STATS["evictions"] += 1
+        conn.commit()
+
+
+def stats(max_mb: int | None = None) -> dict[str, Any]:
+    with _DB_LOCK:
+        entries, total = _db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM asr_cache").fetchone()
+        result: dict[str, Any] = dict(_STATS)
+    lookups = result["hits"] + result["misses"]
+    result["hit_rate"] = round(result["hits"] / lookups, 4) if lookups else 0.0
+    result["entries"] = int(entries)
+    result["bytes"] = int(total)
+    if max_mb is not None:
+        result["max_bytes"] = max_mb * 1024 * 1024
+    return result
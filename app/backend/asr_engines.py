@@ -0,0 +1,513 @@
+from __future__ import annotations
+
+import logging
+from abc import ABC, abstractmethod
+import random
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from .audio import SAMPLE_RATE, DecodedAudio, encode_opus
+from .config import RuntimeSettings
+from .model_registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AsrResult:
+    engine: str
+    text: str
+    lang: str
+    segments: list[dict[str, Any]]
+    duration_sec: float
+
+
+@dataclass(frozen=True)
+class EngineCapabilities:
+    local: bool  # runs in-process with models held per worker slot
+    accepts_pcm: bool  # the full pass should be fed the decoded buffer instead of the file
+    batch: bool  # transcribe_batch() decodes several clips in one model call
+    max_batch_clip_sec: float = 0.0
+
+
+_WORKER_STATE = threading.local()
+
+
+def set_worker_slot(slot: int) -> None:
+    _WORKER_STATE.slot = slot
+
+
+def worker_slot() -> int:
+    return int(getattr(_WORKER_STATE, "slot", 0))
+
+
+def _duration_from_segments(segments: list[dict[str, Any]]) -> float:
+    if not segments:
+        return 0.0
+    return max(float(seg.get("t1", 0.0) or 0.0) for seg in segments)
+
+
+def _normalize_segments(raw_segments: Any) -> list[dict[str, Any]]:
+    segments: list[dict[str, Any]] = []
+    if not raw_segments:
+        return segments
+
+    def _pick(seg_obj: Any, *keys: str, default: Any = None) -> Any:
+        for key in keys:
+            if isinstance(seg_obj, dict) and key in seg_obj:
+                return seg_obj[key]
+            if hasattr(seg_obj, key):
+                return getattr(seg_obj, key)
+        return default
+
+    for seg in raw_segments:
+        t0 = float(_pick(seg, "start", "t0", default=0.0) or 0.0)
+        t1 = float(_pick(seg, "end", "t1", default=0.0) or 0.0)
+        text = str(_pick(seg, "text", default="") or "").strip()
+        segments.append({"t0": t0, "t1": t1, "text": text})
+    return segments
+
+
+def _silence() -> Any:
+    return DecodedAudio(pcm=b"\x00\x00" * SAMPLE_RATE).to_float32()
+
+
+class AsrEngine(ABC):
+    """One ASR backend. Subclasses set `name` and override what they support.
+
+    `load()` prepares the model for the calling worker slot (a no-op for remote
+    engines); `transcribe()` takes the file path and, optionally, its decoded
+    PCM; `transcribe_batch()` defaults to one `transcribe()` per clip.
+    """
+
+    name = ""
+    capabilities = EngineCapabilities(local=False, accepts_pcm=False, batch=False)
+    models: ModelRegistry | None = None
+
+    def model_id(self, settings: RuntimeSettings) -> str:
+        return ""
+
+    def load(self, settings: RuntimeSettings, model: str | None = None) -> None:
+        return None
+
+    @abstractmethod
+    def transcribe(self, audio_path: Path, settings: RuntimeSettings, audio: DecodedAudio | None = None) -> AsrResult:
+        ...
+
+    def transcribe_batch(self, clips: list[DecodedAudio], settings: RuntimeSettings) -> list[AsrResult]:
+        return [self.transcribe(Path("clip.wav"), settings, clip) for clip in clips]
+
+    def pool_workers(self, settings: RuntimeSettings) -> int:
+        """Size of the processing pool when this engine is active."""
+        return settings.scan_workers
+
+    def stats(self) -> dict[str, Any]:
+        return {}
+
+    def registry(self, settings: RuntimeSettings) -> ModelRegistry | None:
+        if self.models is not None:
+            self.models.configure(settings.whisper_idle_ttl_sec, settings.whisper_max_mb)
+        return self.models
+
+
+ENGINES: dict[str, AsrEngine] = {}
+
+
+def register_engine(engine: AsrEngine) -> AsrEngine:
+    ENGINES[engine.name] = engine
+    return engine
+
+
+def get_engine(name: str) -> AsrEngine:
+    # Unknown names fall through to the stub, as the old if-chain did.
+    return ENGINES.get(name) or ENGINES["stub"]
+
+
+def _load_whisper_model(model_name: str) -> Any:
+    try:
+        import whisper  # type: ignore[import-not-found]
+    except ImportError as exc:
+        raise RuntimeError(
+            "ASR_ENGINE=whisper_local 但未安装 openai-whisper。请安装依赖或切换 ASR_ENGINE=stub/openai_api。"
+        ) from exc
+    return whisper.load_model(model_name)
+
+
+def _model_bytes(model: Any) -> int:
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(int(t.numel()) * int(t.element_size()) for t in tensors)
+
+
+class WhisperLocalEngine(AsrEngine):
+    """openai-whisper on PyTorch, fp32 on CPU."""
+
+    name = "whisper_local"
+    # Whisper's decoder works on fixed 30 s mel windows, so only clips that fit
+    # one window can share a batch.
+    capabilities = EngineCapabilities(local=True, accepts_pcm=True, batch=True, max_batch_clip_sec=30.0)
+
+    def __init__(self) -> None:
+        # Keyed by (model name, worker slot). Pool workers claim their own slot so
+        # each one transcribes with a private model; everything else shares slot 0.
+        self.models = ModelRegistry(_load_whisper_model, _model_bytes)
+
+    def model_id(self, settings: RuntimeSettings) -> str:
+        return settings.whisper_model
+
+    def _warmup(self, settings: RuntimeSettings) -> Callable[[Any], None]:
+        def _run(model: Any) -> None:
+            # One second of silence runs every kernel once (mel, encoder, decoder).
+            model.transcribe(
+                _silence(),
+                language=settings.whisper_language or None,
+                verbose=None,
+                task="transcribe",
+                fp16=False,
+            )
+
+        return _run
+
+    def load(self, settings: RuntimeSettings, model: str | None = None) -> None:
+        registry = self.registry(settings)
+        assert registry is not None
+        registry.load(model or settings.whisper_model, worker_slot(), self._warmup(settings))
+
+    def transcribe(self, audio_path: Path, settings: RuntimeSettings, audio: DecodedAudio | None = None) -> AsrResult:
+        registry = self.registry(settings)
+        assert registry is not None
+        source: Any = audio.to_float32() if audio is not None else str(audio_path)
+        # Whisper installs kv-cache hooks on the model per call, so the registry hands
+        # a model instance to one transcription at a time.
+        with registry.use(settings.whisper_model, worker_slot()) as model:
+            data = model.transcribe(
+                source,
+                language=settings.whisper_language or None,
+                verbose=False,
+                task="transcribe",
+                fp16=False,
+            )
+        text = str(data.get("text", "")).strip()
+        segments = _normalize_segments(data.get("segments", []))
+        lang = str(data.get("language", settings.whisper_language)).strip() or settings.whisper_language
+        duration_sec = _duration_from_segments(segments)
+        return AsrResult(engine=self.name, text=text, lang=lang, segments=segments, duration_sec=duration_sec)
+
+    def transcribe_batch(self, clips: list[DecodedAudio], settings: RuntimeSettings) -> list[AsrResult]:
+        import torch  # type: ignore[import-not-found]
+        import whisper  # type: ignore[import-not-found]
+
+        registry = self.registry(settings)
+        assert registry is not None
+        # Batches come from the batcher thread and run on the shared slot-0 model.
+        with registry.use(settings.whisper_model, 0) as model:
+            n_mels = getattr(model.dims, "n_mels", 80)
+            mels = torch.stack(
+                [whisper.log_mel_spectrogram(whisper.pad_or_trim(clip.to_float32()), n_mels) for clip in clips]
+            ).to(model.device)
+            options = whisper.DecodingOptions(
+                task="transcribe",
+                language=settings.whisper_language or None,
+                without_timestamps=True,
+                fp16=False,
+            )
+            decoded = model.decode(mels, options)
+
+        results: list[AsrResult] = []
+        for clip, item in zip(clips, decoded):
+            text = str(item.text).strip()
+            lang = str(getattr(item, "language", "") or settings.whisper_language)
+            results.append(
+                AsrResult(
+                    engine=self.name,
+                    text=text,
+                    lang=lang,
+                    segments=[{"t0": 0.0, "t1": round(clip.duration_sec, 3), "text": text}],
+                    duration_sec=clip.duration_sec,
+                )
+            )
+        return results
+
+
+def _dir_bytes(model: Any) -> int:
+    model_dir = Path(getattr(model, "_model_dir", ""))
+    if not model_dir.is_dir():
+        return 0
+    return sum(file.stat().st_size for file in model_dir.iterdir() if file.is_file())
+
+
+@dataclass(frozen=True)
+class _Ct2Spec:
+    """Everything a faster-whisper model is built from; models are keyed by it."""
+
+    model_dir: str
+    compute_type: str
+    cpu_threads: int
+
+    def __str__(self) -> str:
+        return f"{self.model_dir}:{self.compute_type}"
+
+
+class FasterWhisperEngine(AsrEngine):
+    """CTranslate2 Whisper (faster-whisper) with int8 weights on CPU.
+
+    Loads a converted model from `CT2_MODEL_DIR` only; nothing is downloaded.
+    """
+
+    name = "faster_whisper"
+    capabilities = EngineCapabilities(local=True, accepts_pcm=True, batch=False)
+
+    def __init__(self) -> None:
+        self.models = ModelRegistry(self._load_model, _dir_bytes)
+
+    def model_id(self, settings: RuntimeSettings) -> str:
+        return f"{settings.ct2_model_dir}:{settings.ct2_compute_type}"
+
+    def _load_model(self, spec: _Ct2Spec) -> Any:
+        try:
+            from faster_whisper import WhisperModel  # type: ignore[import-not-found]
+        except ImportError as exc:
+            raise RuntimeError("ASR_ENGINE=faster_whisper 但未安装 faster-whisper。") from exc
+        if not Path(spec.model_dir).is_dir():
+            raise RuntimeError(f"CT2_MODEL_DIR 不存在或不是目录：{spec.model_dir}")
+        model = WhisperModel(
+            spec.model_dir,
+            device="cpu",
+            compute_type=spec.compute_type,
+            cpu_threads=spec.cpu_threads,
+            local_files_only=True,
+        )
+        model._model_dir = spec.model_dir
+        return model
+
+    def _spec(self, settings: RuntimeSettings) -> _Ct2Spec:
+        if not settings.ct2_model_dir:
+            raise RuntimeError("ASR_ENGINE=faster_whisper 需要设置 CT2_MODEL_DIR。")
+        # Changing CT2_COMPUTE_TYPE or CT2_CPU_THREADS loads a new model instead of
+        # reusing one built with the old options.
+        return _Ct2Spec(settings.ct2_model_dir, settings.ct2_compute_type, settings.ct2_cpu_threads)
+
+    def _run(self, model: Any, source: Any, settings: RuntimeSettings) -> tuple[list[Any], Any]:
+        segments, info = model.transcribe(source, language=settings.whisper_language or None, task="transcribe")
+        # Segments are generated lazily; drain them while the model is held.
+        return list(segments), info
+
+    def load(self, settings: RuntimeSettings, model: str | None = None) -> None:
+        registry = self.registry(settings)
+        assert registry is not None
+        registry.load(self._spec(settings), worker_slot(), lambda m: self._run(m, _silence(), settings))
+
+    def transcribe(self, audio_path: Path, settings: RuntimeSettings, audio: DecodedAudio | None = None) -> AsrResult:
+        registry = self.registry(settings)
+        assert registry is not None
+        source: Any = audio.to_float32() if audio is not None else str(audio_path)
+        with registry.use(self._spec(settings), worker_slot()) as model:
+            raw_segments, info = self._run(model, source, settings)
+        segments = _normalize_segments(raw_segments)
+        text = "".join(str(seg.text) for seg in raw_segments).strip()
+        lang = str(getattr(info, "language", "") or settings.whisper_language)
+        duration_sec = float(getattr(info, "duration", 0.0) or _duration_from_segments(segments))
+        return AsrResult(engine=self.name, text=text, lang=lang, segments=segments, duration_sec=duration_sec)
+
+
+class _RateLimiter:
+    """Spaces request starts evenly so at most `per_minute` begin per minute."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self, per_minute: int) -> float:
+        """Block until the next request may start; returns the seconds waited."""
+        if per_minute <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + 60.0 / per_minute
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+def _retry_after(exc: Exception) -> float | None:
+    response = getattr(exc, "response", None)
+    value = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class OpenAIApiEngine(AsrEngine):
+    """OpenAI-compatible transcription API (also any gateway behind OPENAI_BASE_URL).
+
+    One client, and with it one keep-alive connection pool, is shared by every
+    worker. Requests are capped by a concurrency semaphore and a start-rate
+    limit, and retried with exponential backoff (or the server's Retry-After)
+    on 429, 5xx and connection errors.
+    """
+
+    name = "openai_api"
+    BACKOFF_BASE_SEC = 0.5
+    BACKOFF_MAX_SEC = 30.0
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._clients: dict[tuple[str, str | None, int], Any] = {}
+        self._semaphores: dict[int, threading.BoundedSemaphore] = {}
+        self._rate = _RateLimiter()
+        self._stats = {"requests": 0, "retries": 0, "failures": 0, "throttled_ms": 0.0, "upload_bytes": 0, "source_bytes": 0}
+
+    def model_id(self, settings: RuntimeSettings) -> str:
+        # Transcoding changes what the server hears, so it is part of the identity.
+        suffix = "+opus" if settings.openai_upload_format == "opus" else ""
+        return settings.openai_model + suffix
+
+    def pool_workers(self, settings: RuntimeSettings) -> int:
+        # Workers mostly wait on the network, so keep enough to fill the request limit.
+        return max(settings.scan_workers, settings.openai_max_concurrency)
+
+    def _client(self, settings: RuntimeSettings) -> Any:
+        try:
+            import httpx  # type: ignore[import-not-found]
+            from openai import OpenAI  # type: ignore[import-not-found]
+        except ImportError as exc:
+            raise RuntimeError("ASR_ENGINE=openai_api 但未安装 openai SDK。") from exc
+
+        if not settings.openai_api_key:
+            raise RuntimeError("ASR_ENGINE=openai_api 需要设置 OPENAI_API_KEY。")
+
+        key = (settings.openai_api_key, settings.openai_base_url, settings.openai_max_concurrency)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                limits = httpx.Limits(
+                    max_connections=settings.openai_max_concurrency,
+                    max_keepalive_connections=settings.openai_max_concurrency,
+                    keepalive_expiry=60.0,
+                )
+                client = OpenAI(
+                    api_key=settings.openai_api_key,
+                    base_url=settings.openai_base_url,
+                    max_retries=0,  # retried here, so throttling and backoff are counted once
+                    http_client=httpx.Client(limits=limits, timeout=httpx.Timeout(600.0, connect=10.0)),
+                )
+                self._clients[key] = client
+            return client
+
+    def _semaphore(self, settings: RuntimeSettings) -> threading.BoundedSemaphore:
+        with self._lock:
+            return self._semaphores.setdefault(
+                settings.openai_max_concurrency, threading.BoundedSemaphore(settings.openai_max_concurrency)
+            )
+
+    def _upload(self, audio_path: Path, settings: RuntimeSettings, audio: DecodedAudio | None) -> tuple[str, bytes]:
+        """The (filename, bytes) to send; read once so retries resend the same payload."""
+        upload: tuple[str, bytes] | None = None
+        if audio is not None:
+            source_size = len(audio.pcm) + 44  # as a WAV
+        else:
+            source_size = audio_path.stat().st_size
+        if settings.openai_upload_format == "opus":
+            encoded = encode_opus(audio if audio is not None else audio_path)
+            if encoded is not None:
+                upload = (f"{audio_path.stem}.ogg", encoded)
+        if upload is None:
+            if audio is not None:
+                upload = (f"{audio_path.stem}.wav", audio.to_wav_bytes())
+            else:
+                upload = (audio_path.name, audio_path.read_bytes())
+        with self._lock:
+            self._stats["source_bytes"] += source_size
+            self._stats["upload_bytes"] += len(upload[1])
+        return upload
+
+    def _retry_delay(self, exc: Exception, attempt: int) -> float | None:
+        from openai import APIConnectionError, APIStatusError  # type: ignore[import-not-found]
+
+        if isinstance(exc, APIStatusError):
+            if exc.status_code != 429 and exc.status_code < 500:
+                return None
+        elif not isinstance(exc, APIConnectionError):
+            return None
+        delay = _retry_after(exc)
+        if delay is None:
+            delay = min(self.BACKOFF_MAX_SEC, self.BACKOFF_BASE_SEC * (2**attempt)) * (0.5 + random.random() / 2)
+        return delay
+
+    def _create(self, settings: RuntimeSettings, upload: tuple[str, bytes]) -> Any:
+        client = self._client(settings)
+        attempt = 0
+        while True:
+            with self._semaphore(settings):
+                waited = self._rate.wait(settings.openai_max_rpm)
+                with self._lock:
+                    self._stats["requests"] += 1
+                    self._stats["throttled_ms"] = round(self._stats["throttled_ms"] + waited * 1000, 2)
+                try:
+                    return client.audio.transcriptions.create(
+                        model=settings.openai_model,
+                        file=upload,
+                        response_format="verbose_json",
+                        language=settings.whisper_language,
+                    )
+                except Exception as exc:
+                    delay = self._retry_delay(exc, attempt) if attempt < settings.openai_max_retries else None
+                    if delay is None:
+                        with self._lock:
+                            self._stats["failures"] += 1
+                        raise
+                    logger.warning("OpenAI ASR request failed (%s), retry %s in %.1fs", exc, attempt + 1, delay)
+            # Back off outside the semaphore so other workers keep the slots busy.
+            with self._lock:
+                self._stats["retries"] += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def transcribe(self, audio_path: Path, settings: RuntimeSettings, audio: DecodedAudio | None = None) -> AsrResult:
+        self._client(settings)  # configuration errors before any file work
+        response = self._create(settings, self._upload(audio_path, settings, audio))
+
+        if hasattr(response, "model_dump"):
+            payload = response.model_dump()
+        elif isinstance(response, dict):
+            payload = response
+        else:
+            payload = {"text": str(response)}
+
+        text = str(payload.get("text", "")).strip()
+        lang = str(payload.get("language", settings.whisper_language)).strip() or settings.whisper_language
+        segments = _normalize_segments(payload.get("segments", []))
+        duration_sec = float(payload.get("duration", 0.0) or _duration_from_segments(segments))
+        return AsrResult(engine=self.name, text=text, lang=lang, segments=segments, duration_sec=duration_sec)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        if stats["source_bytes"]:
+            stats["upload_ratio"] = round(stats["upload_bytes"] / stats["source_bytes"], 4)
+        return stats
+
+
+class StubEngine(AsrEngine):
+    name = "stub"
+
+    def transcribe(self, audio_path: Path, settings: RuntimeSettings, audio: DecodedAudio | None = None) -> AsrResult:
+        text = audio_path.stem
+        return AsrResult(
+            engine=self.name,
+            text=text,
+            lang="zh",
+            segments=[{"t0": 0.0, "t1": 0.0, "text": text}],
+            duration_sec=0.0,
+        )
+
+
+register_engine(WhisperLocalEngine())
+register_engine(FasterWhisperEngine())
+register_engine(OpenAIApiEngine())
+register_engine(StubEngine())
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import io
+import operator
+import subprocess
+import sys
+import wave
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from shutil import which
+from typing import Any
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+# Mono speech at 16 kHz stays intelligible to ASR well below this bitrate.
+OPUS_BITRATE = "24k"
+
+
+@dataclass(frozen=True)
+class DecodedAudio:
+    """16 kHz mono signed 16-bit little-endian PCM held in memory."""
+
+    pcm: bytes
+    sample_rate: int = SAMPLE_RATE
+
+    @property
+    def num_samples(self) -> int:
+        return len(self.pcm) // SAMPLE_WIDTH
+
+    @property
+    def duration_sec(self) -> float:
+        return self.num_samples / float(self.sample_rate)
+
+    def slice(self, start_sec: float, end_sec: float | None = None) -> DecodedAudio:
+        start = max(0, int(start_sec * self.sample_rate)) * SAMPLE_WIDTH
+        stop = len(self.pcm) if end_sec is None else max(0, int(end_sec * self.sample_rate)) * SAMPLE_WIDTH
+        return DecodedAudio(pcm=self.pcm[start:stop], sample_rate=self.sample_rate)
+
+    def to_float32(self) -> Any:
+        # Same normalisation as whisper.audio.load_audio, so results match a path-based call.
+        import numpy as np  # type: ignore[import-not-found]
+
+        return np.frombuffer(self.pcm, np.int16).flatten().astype(np.float32) / 32768.0
+
+    def to_wav_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(SAMPLE_WIDTH)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(self.pcm)
+        return buf.getvalue()
+
+
+def detect_speech_onset(
+    audio: DecodedAudio,
+    frame_ms: int = 30,
+    min_speech_ms: int = 150,
+    preroll_ms: int = 200,
+    max_search_sec: float = 30.0,
+) -> float | None:
+    """Seconds to the first sustained speech, from frame energy against the noise floor.
+
+    A frame counts as voiced when its mean energy clears both an absolute floor
+    and 4x the quietest tenth of the searched frames (the room noise). Speech
+    starts at the first run of voiced frames lasting `min_speech_ms`; the onset
+    is moved back by `preroll_ms` so soft initial consonants are kept. Returns
+    None when nothing in the first `max_search_sec` looks like speech.
+    """
+    frame_len = max(1, audio.sample_rate * frame_ms // 1000)
+    samples = array("h")
+    search_bytes = int(max_search_sec * audio.sample_rate) * SAMPLE_WIDTH
+    samples.frombytes(audio.pcm[: min(len(audio.pcm), search_bytes) // SAMPLE_WIDTH * SAMPLE_WIDTH])
+    if sys.byteorder == "big":
+        samples.byteswap()
+
+    energies: list[float] = []
+    for start in range(0, len(samples) - frame_len + 1, frame_len):
+        frame = samples[start : start + frame_len]
+        energies.append(sum(map(operator.mul, frame, frame)) / frame_len)
+    if not energies:
+        return None
+
+    noise_floor = sorted(energies)[len(energies) // 10]
+    # ~-50 dBFS; keeps digital silence and faint hiss from counting as speech.
+    threshold = max(100.0**2, noise_floor * 4.0)
+    min_frames = max(1, min_speech_ms // frame_ms)
+
+    run = 0
+    for pos, energy in enumerate(energies):
+        run = run + 1 if energy >= threshold else 0
+        if run >= min_frames:
+            onset_frame = pos - min_frames + 1
+            onset_sec = onset_frame * frame_len / audio.sample_rate - preroll_ms / 1000.0
+            return max(0.0, round(onset_sec, 3))
+    return None
+
+
+def quietest_point(audio: DecodedAudio, around_sec: float, search_sec: float = 2.0, frame_ms: int = 30) -> float:
+    """Start of the lowest-energy frame within `search_sec` of `around_sec`.
+
+    Used to cut long recordings between words rather than through one.
+    """
+    frame_len = max(1, audio.sample_rate * frame_ms // 1000)
+    first = max(0, int((around_sec - search_sec) * audio.sample_rate))
+    last = min(audio.num_samples, int((around_sec + search_sec) * audio.sample_rate))
+    samples = array("h")
+    samples.frombytes(audio.pcm[first * SAMPLE_WIDTH : last * SAMPLE_WIDTH])
+    if sys.byteorder == "big":
+        samples.byteswap()
+
+    best_start, best_energy = None, 0
+    for start in range(0, len(samples) - frame_len + 1, frame_len):
+        frame = samples[start : start + frame_len]
+        energy = sum(map(operator.mul, frame, frame))
+        if best_start is None or energy < best_energy:
+            best_start, best_energy = start, energy
+    if best_start is None:
+        return around_sec
+    return round((first + best_start) / audio.sample_rate, 3)
+
+
+def has_ffmpeg() -> bool:
+    return bool(which("ffmpeg"))
+
+
+def decode_audio(audio_path: Path) -> DecodedAudio | None:
+    if not has_ffmpeg():
+        return None
+
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        str(audio_path),
+        "-vn",
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-",
+    ]
+    proc = subprocess.run(cmd, capture_output=True)
+    if proc.returncode != 0:
+        return None
+    return DecodedAudio(pcm=proc.stdout)
+
+
+def encode_opus(source: Path | DecodedAudio, bitrate: str = OPUS_BITRATE) -> bytes | None:
+    """Ogg/Opus bytes for a file or a decoded buffer; None when ffmpeg is missing or fails."""
+    if not has_ffmpeg():
+        return None
+
+    if isinstance(source, DecodedAudio):
+        input_args = ["-f", "s16le", "-ac", "1", "-ar", str(source.sample_rate), "-i", "-"]
+        stdin = source.pcm
+    else:
+        input_args = ["-nostdin", "-i", str(source)]
+        stdin = None
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        *input_args,
+        "-vn",
+        "-ac",
+        "1",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-c:a",
+        "libopus",
+        "-b:a",
+        bitrate,
+        "-application",
+        "voip",
+        "-f",
+        "ogg",
+        "-",
+    ]
+    proc = subprocess.run(cmd, input=stdin, capture_output=True)
+    if proc.returncode != 0 or not proc.stdout:
+        return None
+    return proc.stdout
@@ -7,7 +7,9 @@ from pathlib import Path
 from typing import Final
 
 PROJECT_ROOT: Final[Path] = Path(__file__).resolve().parents[2]
-VAULT_ROOT: Final[Path] = PROJECT_ROOT / "HomeworkVault"
+# Benchmark harness only: it points this at a throwaway vault. The app stores
+# and serves paths relative to PROJECT_ROOT, so a real vault must stay inside it.
+VAULT_ROOT: Final[Path] = Path(os.getenv("HOMEWORK_VAULT_ROOT", "").strip() or PROJECT_ROOT / "HomeworkVault")
 INBOX_DIR: Final[Path] = VAULT_ROOT / "Inbox"
 LIBRARY_DIR: Final[Path] = VAULT_ROOT / "Library"
 LIBRARY_VOCAB_DIR: Final[Path] = LIBRARY_DIR / "Vocab"
@@ -16,9 +18,18 @@ LIBRARY_FASTSTORY_DIR: Final[Path] = LIBRARY_DIR / "FastStory"
 DAILY_DIR: Final[Path] = VAULT_ROOT / "Daily"
 CONFIG_DIR: Final[Path] = VAULT_ROOT / "Config"
 REPORTS_DIR: Final[Path] = VAULT_ROOT / "Reports"
+CACHE_DIR: Final[Path] = VAULT_ROOT / "Cache"
+ORIGINALS_DIR: Final[Path] = VAULT_ROOT / "Originals"
 MAPPINGS_PATH: Final[Path] = CONFIG_DIR / "mappings.json"
 TEACHER_CMD_PATH: Final[Path] = CONFIG_DIR / "teacher_cmd.txt"
 INBOX_ITEMS_PATH: Final[Path] = REPORTS_DIR / "inbox_items.json"
+INBOX_DB_PATH: Final[Path] = REPORTS_DIR / "inbox_items.sqlite3"
+ASR_CACHE_PATH: Final[Path] = CACHE_DIR / "asr_cache.sqlite3"
+FINGERPRINT_DB_PATH: Final[Path] = CACHE_DIR / "fingerprints.sqlite3"
+PROFILES_DIR: Final[Path] = REPORTS_DIR / "profiles"
+
+# How long a cached mappings.json is trusted before its mtime/size is checked again.
+MAPPINGS_RECHECK_SEC: Final[float] = 2.0
 
 AUDIO_EXTENSIONS: Final[set[str]] = {".m4a", ".mp3", ".wav", ".aac", ".flac", ".ogg"}
 
@@ -28,20 +39,50 @@ class RuntimeSettings:
     asr_engine: str
     asr_process_scope: str
     asr_tag_window_sec: int
+    asr_tag_vad: bool
+    asr_chunk_sec: int
     whisper_model: str
     whisper_language: str
     openai_model: str
     openai_api_key: str | None
     openai_base_url: str | None
+    openai_max_concurrency: int
+    openai_max_rpm: int
+    openai_max_retries: int
+    openai_upload_format: str
+    scan_workers: int
+    asr_batch_max: int
+    asr_batch_wait_ms: int
+    asr_cache_max_mb: int
+    upload_max_mb: int
+    daily_link_mode: str
+    take_dedup: bool
+    archive_codec: str
+    archive_opus_kbps: int
+    archive_keep_original: bool
+    archive_workers: int
+    inbox_watch: bool
+    inbox_watch_poll_ms: int
+    inbox_watch_settle_ms: int
+    whisper_preload: tuple[str, ...]
+    whisper_idle_ttl_sec: int
+    whisper_max_mb: int
+    ct2_model_dir: str | None
+    ct2_compute_type: str
+    ct2_cpu_threads: int
+    profile_on_demand: bool
+    profile_sample_rate: float
+    profile_interval_ms: int
+    profile_keep: int
 
 
 def load_runtime_settings() -> RuntimeSettings:
     asr_engine = os.getenv("ASR_ENGINE", "whisper_local").strip().lower()
-    if asr_engine not in {"whisper_local", "openai_api", "stub"}:
+    if asr_engine not in {"whisper_local", "faster_whisper", "openai_api", "stub"}:
         asr_engine = "whisper_local"
 
     asr_process_scope = os.getenv("ASR_PROCESS_SCOPE", "hybrid").strip().lower()
-    if asr_process_scope not in {"head", "full", "hybrid"}:
+    if asr_process_scope not in {"head", "full", "hybrid", "adaptive"}:
         asr_process_scope = "hybrid"
 
     raw_window = os.getenv("ASR_TAG_WINDOW_SEC", "20").strip()
@@ -50,18 +91,202 @@ def load_runtime_settings() -> RuntimeSettings:
     except ValueError:
         asr_tag_window_sec = 20
 
+    asr_tag_vad = os.getenv("ASR_TAG_VAD", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+    # Full passes over longer audio are split into chunks of about this length; 0 disables.
+    raw_chunk = os.getenv("ASR_CHUNK_SEC", "600").strip()
+    try:
+        asr_chunk_sec = max(0, int(raw_chunk))
+    except ValueError:
+        asr_chunk_sec = 600
+
+    raw_workers = os.getenv("SCAN_WORKERS", "1").strip()
+    try:
+        scan_workers = max(1, int(raw_workers))
+    except ValueError:
+        scan_workers = 1
+
+    raw_batch_max = os.getenv("ASR_BATCH_MAX", "1").strip()
+    try:
+        asr_batch_max = max(1, int(raw_batch_max))
+    except ValueError:
+        asr_batch_max = 1
+
+    raw_batch_wait = os.getenv("ASR_BATCH_WAIT_MS", "50").strip()
+    try:
+        asr_batch_wait_ms = max(0, int(raw_batch_wait))
+    except ValueError:
+        asr_batch_wait_ms = 50
+
+    raw_cache_mb = os.getenv("ASR_CACHE_MAX_MB", "256").strip()
+    try:
+        asr_cache_max_mb = max(0, int(raw_cache_mb))
+    except ValueError:
+        asr_cache_max_mb = 256
+
+    raw_upload_mb = os.getenv("UPLOAD_MAX_MB", "200").strip()
+    try:
+        upload_max_mb = max(0, int(raw_upload_mb))
+    except ValueError:
+        upload_max_mb = 200
+
+    daily_link_mode = os.getenv("DAILY_LINK_MODE", "auto").strip().lower()
+    if daily_link_mode not in {"auto", "reflink", "hardlink", "copy"}:
+        daily_link_mode = "auto"
+
+    take_dedup = os.getenv("TAKE_DEDUP", "1").strip().lower() in {"1", "true", "yes", "on"}
+
+    archive_codec = os.getenv("ARCHIVE_CODEC", "original").strip().lower()
+    if archive_codec not in {"original", "opus"}:
+        archive_codec = "original"
+
+    raw_opus_kbps = os.getenv("ARCHIVE_OPUS_KBPS", "32").strip()
+    try:
+        archive_opus_kbps = min(128, max(6, int(raw_opus_kbps)))
+    except ValueError:
+        archive_opus_kbps = 32
+
+    archive_keep_original = os.getenv("ARCHIVE_KEEP_ORIGINAL", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+    raw_archive_workers = os.getenv("ARCHIVE_WORKERS", "1").strip()
+    try:
+        archive_workers = max(1, int(raw_archive_workers))
+    except ValueError:
+        archive_workers = 1
+
+    inbox_watch = os.getenv("INBOX_WATCH", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+    raw_poll_ms = os.getenv("INBOX_WATCH_POLL_MS", "1000").strip()
+    try:
+        inbox_watch_poll_ms = max(100, int(raw_poll_ms))
+    except ValueError:
+        inbox_watch_poll_ms = 1000
+
+    raw_settle_ms = os.getenv("INBOX_WATCH_SETTLE_MS", "1500").strip()
+    try:
+        inbox_watch_settle_ms = max(0, int(raw_settle_ms))
+    except ValueError:
+        inbox_watch_settle_ms = 1500
+
+    whisper_model = os.getenv("WHISPER_MODEL", "small").strip()
+    # Default: preload the configured model when a local engine is active; "none" disables.
+    raw_preload = os.getenv("WHISPER_PRELOAD", "").strip()
+    if not raw_preload:
+        whisper_preload: tuple[str, ...] = (
+            (whisper_model,) if asr_engine in {"whisper_local", "faster_whisper"} else ()
+        )
+    elif raw_preload.lower() == "none":
+        whisper_preload = ()
+    else:
+        whisper_preload = tuple(dict.fromkeys(name.strip() for name in raw_preload.split(",") if name.strip()))
+
+    raw_idle_ttl = os.getenv("WHISPER_IDLE_TTL_SEC", "1800").strip()
+    try:
+        whisper_idle_ttl_sec = max(0, int(raw_idle_ttl))
+    except ValueError:
+        whisper_idle_ttl_sec = 1800
+
+    raw_model_mb = os.getenv("WHISPER_MAX_MB", "0").strip()
+    try:
+        whisper_max_mb = max(0, int(raw_model_mb))
+    except ValueError:
+        whisper_max_mb = 0
+
+    ct2_model_dir = os.getenv("CT2_MODEL_DIR", "").strip() or None
+    ct2_compute_type = os.getenv("CT2_COMPUTE_TYPE", "int8").strip().lower() or "int8"
+
+    raw_ct2_threads = os.getenv("CT2_CPU_THREADS", "0").strip()
+    try:
+        ct2_cpu_threads = max(0, int(raw_ct2_threads))
+    except ValueError:
+        ct2_cpu_threads = 0
+
     openai_api_key = os.getenv("OPENAI_API_KEY", "").strip() or None
     openai_base_url = os.getenv("OPENAI_BASE_URL", "").strip() or None
 
+    raw_concurrency = os.getenv("OPENAI_MAX_CONCURRENCY", "4").strip()
+    try:
+        openai_max_concurrency = max(1, int(raw_concurrency))
+    except ValueError:
+        openai_max_concurrency = 4
+
+    raw_rpm = os.getenv("OPENAI_MAX_RPM", "0").strip()
+    try:
+        openai_max_rpm = max(0, int(raw_rpm))
+    except ValueError:
+        openai_max_rpm = 0
+
+    raw_retries = os.getenv("OPENAI_MAX_RETRIES", "5").strip()
+    try:
+        openai_max_retries = max(0, int(raw_retries))
+    except ValueError:
+        openai_max_retries = 5
+
+    openai_upload_format = os.getenv("OPENAI_UPLOAD_FORMAT", "original").strip().lower()
+    if openai_upload_format not in {"original", "opus"}:
+        openai_upload_format = "original"
+
+    # X-Profile header / ?profile=1 are only honoured with PROFILE_ON_DEMAND=1:
+    # any client could otherwise make the server sample itself and write files.
+    profile_on_demand = os.getenv("PROFILE_ON_DEMAND", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+    raw_sample_rate = os.getenv("PROFILE_SAMPLE_RATE", "0").strip()
+    try:
+        profile_sample_rate = min(1.0, max(0.0, float(raw_sample_rate)))
+    except ValueError:
+        profile_sample_rate = 0.0
+
+    raw_profile_interval = os.getenv("PROFILE_INTERVAL_MS", "5").strip()
+    try:
+        profile_interval_ms = max(1, int(raw_profile_interval))
+    except ValueError:
+        profile_interval_ms = 5
+
+    raw_profile_keep = os.getenv("PROFILE_KEEP", "200").strip()
+    try:
+        profile_keep = max(0, int(raw_profile_keep))
+    except ValueError:
+        profile_keep = 200
+
     return RuntimeSettings(
         asr_engine=asr_engine,
         asr_process_scope=asr_process_scope,
         asr_tag_window_sec=asr_tag_window_sec,
-        whisper_model=os.getenv("WHISPER_MODEL", "small").strip(),
+        asr_tag_vad=asr_tag_vad,
+        asr_chunk_sec=asr_chunk_sec,
+        whisper_model=whisper_model,
         whisper_language=os.getenv("WHISPER_LANGUAGE", "zh").strip(),
         openai_model=os.getenv("OPENAI_ASR_MODEL", "whisper-1").strip(),
         openai_api_key=openai_api_key,
         openai_base_url=openai_base_url,
+        openai_max_concurrency=openai_max_concurrency,
+        openai_max_rpm=openai_max_rpm,
+        openai_max_retries=openai_max_retries,
+        openai_upload_format=openai_upload_format,
+        scan_workers=scan_workers,
+        asr_batch_max=asr_batch_max,
+        asr_batch_wait_ms=asr_batch_wait_ms,
+        asr_cache_max_mb=asr_cache_max_mb,
+        upload_max_mb=upload_max_mb,
+        daily_link_mode=daily_link_mode,
+        take_dedup=take_dedup,
+        archive_codec=archive_codec,
+        archive_opus_kbps=archive_opus_kbps,
+        archive_keep_original=archive_keep_original,
+        archive_workers=archive_workers,
+        inbox_watch=inbox_watch,
+        inbox_watch_poll_ms=inbox_watch_poll_ms,
+        inbox_watch_settle_ms=inbox_watch_settle_ms,
+        whisper_preload=whisper_preload,
+        whisper_idle_ttl_sec=whisper_idle_ttl_sec,
+        whisper_max_mb=whisper_max_mb,
+        ct2_model_dir=ct2_model_dir,
+        ct2_compute_type=ct2_compute_type,
+        ct2_cpu_threads=ct2_cpu_threads,
+        profile_on_demand=profile_on_demand,
+        profile_sample_rate=profile_sample_rate,
+        profile_interval_ms=profile_interval_ms,
+        profile_keep=profile_keep,
     )
 
 
@@ -124,7 +349,15 @@ def build_default_mappings() -> dict[str, object]:
     return mappings
 
 
-def ensure_bootstrap() -> None:
+_BOOTSTRAPPED = False
+
+
+def ensure_bootstrap(force: bool = False) -> None:
+    # Runs its directory/file checks once per process; pass force=True to re-check.
+    global _BOOTSTRAPPED
+    if _BOOTSTRAPPED and not force:
+        return
+
     for path in (
         INBOX_DIR,
         LIBRARY_VOCAB_DIR,
@@ -133,6 +366,7 @@ def ensure_bootstrap() -> None:
         DAILY_DIR,
         CONFIG_DIR,
         REPORTS_DIR,
+        CACHE_DIR,
     ):
         path.mkdir(parents=True, exist_ok=True)
 
@@ -145,5 +379,4 @@ def ensure_bootstrap() -> None:
     if not TEACHER_CMD_PATH.exists():
         TEACHER_CMD_PATH.write_text("", encoding="utf-8")
 
-    if not INBOX_ITEMS_PATH.exists():
-        INBOX_ITEMS_PATH.write_text("[]", encoding="utf-8")
+    _BOOTSTRAPPED = True
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import operator
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .audio import DecodedAudio
+from .config import CACHE_DIR, FINGERPRINT_DB_PATH
+
+# 32 ms windows every 16 ms at 16 kHz; the envelope at this rate survives
+# AAC/MP3/Opus re-encoding, resampling and gain changes, while two readings of
+# the same text differ in timing far more than that.
+HOP_SAMPLES = 256
+FINGERPRINT_MAX_SEC = 60.0
+# Encoder delay and trimmed padding shift the decoded signal by up to ~250 ms.
+MAX_OFFSET_FRAMES = 16
+MIN_COMPARED_FRAMES = 32
+# Re-encoded copies land well under 0.05; another reading of the same text is
+# usually ~0.25+, but a closely timed one can fall below 0.1, so a match under
+# this threshold is only a hint for review, never grounds to drop a file.
+MAX_BIT_ERROR_RATE = 0.12
+DURATION_TOLERANCE = 0.02
+DURATION_SLACK_SEC = 0.5
+
+_DB_LOCK = threading.Lock()
+_DB: sqlite3.Connection | None = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS takes (
+    path TEXT PRIMARY KEY,
+    item_type TEXT NOT NULL,
+    item_index INTEGER NOT NULL,
+    record_id TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    duration_sec REAL NOT NULL,
+    fingerprint BLOB,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_takes_sha256 ON takes(sha256);
+CREATE INDEX IF NOT EXISTS idx_takes_duration ON takes(duration_sec);
+"""
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    """Bit planes over overlapping 32 ms frames; bit t of each plane describes frame t vs t-1.
+
+    `low`/`high` are the direction of the energy change in the low-passed
+    (x[n] + x[n-1]) and high-passed (x[n] - x[n-1]) signal, `slope` that of the
+    total energy over two frames. `voiced` masks frames too quiet to compare.
+    All are sign tests, so they do not depend on the recording gain.
+    """
+
+    frames: int
+    low: int
+    high: int
+    slope: int
+    voiced: int
+
+    def to_blob(self) -> bytes:
+        width = (self.frames + 7) // 8
+        header = self.frames.to_bytes(4, "little")
+        return header + b"".join(plane.to_bytes(width, "little") for plane in (self.low, self.high, self.slope, self.voiced))
+
+    @classmethod
+    def from_blob(cls, blob: bytes) -> Fingerprint:
+        frames = int.from_bytes(blob[:4], "little")
+        width = (frames + 7) // 8
+        planes = [int.from_bytes(blob[4 + n * width : 4 + (n + 1) * width], "little") for n in range(4)]
+        return cls(frames, *planes)
+
+
+@dataclass(frozen=True)
+class TakeMatch:
+    path: Path
+    item_type: str
+    index: int
+    record_id: str
+    kind: str  # "exact" | "perceptual"
+    bit_error_rate: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"kind": self.kind, "bit_error_rate": round(self.bit_error_rate, 4), "record_id": self.record_id}
+
+
+def compute(audio: DecodedAudio) -> Fingerprint | None:
+    samples = array("h")
+    limit = int(FINGERPRINT_MAX_SEC * audio.sample_rate) * 2
+    samples.frombytes(audio.pcm[: min(len(audio.pcm), limit) // 2 * 2])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    blocks = len(samples) // HOP_SAMPLES
+    frames = blocks - 1
+    if frames < 2:
+        return None
+
+    # Per hop: energy and lag-1 autocorrelation. The low/high band energies of a
+    # window follow from those two sums: sum (x[n] +/- x[n-1])^2 ~ 2 * (E +/- C).
+    energy: list[int] = []
+    lag1: list[int] = []
+    for block in range(blocks):
+        chunk = samples[block * HOP_SAMPLES : (block + 1) * HOP_SAMPLES]
+        energy.append(sum(map(operator.mul, chunk, chunk)))
+        lag1.append(sum(map(operator.mul, chunk[1:], chunk[:-1])))
+    # Windows of two hops, so consecutive frames overlap by half.
+    low = [max(1, energy[t] + energy[t + 1] + lag1[t] + lag1[t + 1]) for t in range(frames)]
+    high = [max(1, energy[t] + energy[t + 1] - lag1[t] - lag1[t + 1]) for t in range(frames)]
+
+    totals = sorted(lo + hi for lo, hi in zip(low, high))
+    loud = totals[len(totals) * 9 // 10]
+    # ~-20 dB under the loud frames, with an absolute floor for digital silence.
+    threshold = max(loud / 100.0, float(2 * HOP_SAMPLES * 100**2))
+
+    low_bits = high_bits = slope_bits = voiced_bits = 0
+    for t in range(1, frames):
+        bit = 1 << t
+        if low[t] > low[t - 1]:
+            low_bits |= bit
+        if high[t] > high[t - 1]:
+            high_bits |= bit
+        if t >= 2 and low[t] + high[t] > low[t - 2] + high[t - 2]:
+            slope_bits |= bit
+        if low[t] + high[t] >= threshold and low[t - 1] + high[t - 1] >= threshold:
+            voiced_bits |= bit
+    return Fingerprint(frames, low_bits, high_bits, slope_bits, voiced_bits)
+
+
+def bit_error_rate(a: Fingerprint, b: Fingerprint) -> float:
+    """Lowest error rate over small alignments; 1.0 when too little overlaps to judge."""
+    planes_a = (a.low, a.high, a.slope, a.voiced)
+    planes_b = (b.low, b.high, b.slope, b.voiced)
+    best = 1.0
+    for offset in range(-MAX_OFFSET_FRAMES, MAX_OFFSET_FRAMES + 1):
+        # Drop `offset` leading frames from whichever side starts later.
+        low_a, high_a, slope_a, voiced_a = (plane >> max(0, -offset) for plane in planes_a)
+        low_b, high_b, slope_b, voiced_b = (plane >> max(0, offset) for plane in planes_b)
+        mask = voiced_a & voiced_b
+        compared = mask.bit_count()
+        if compared < MIN_COMPARED_FRAMES:
+            continue
+        errors = (
+            ((low_a ^ low_b) & mask).bit_count()
+            + ((high_a ^ high_b) & mask).bit_count()
+            + ((slope_a ^ slope_b) & mask).bit_count()
+        )
+        best = min(best, errors / (compared * 3))
+    return best
+
+
+def _db() -> sqlite3.Connection:
+    # Callers hold _DB_LOCK; one connection is shared by every thread.
+    global _DB
+    if _DB is None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(FINGERPRINT_DB_PATH), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _DB = conn
+    return _DB
+
+
+def _forget_missing(rows: list[tuple[Any, ...]]) -> list[tuple[Any, ...]]:
+    # Takes deleted or moved by hand since they were indexed.
+    present = [row for row in rows if Path(row[0]).is_file()]
+    stale = [(row[0],) for row in rows if not Path(row[0]).is_file()]
+    if stale:
+        with _DB_LOCK:
+            conn = _db()
+            conn.executemany("DELETE FROM takes WHERE path = ?", stale)
+            conn.commit()
+    return present
+
+
+def find_exact(sha256: str) -> TakeMatch | None:
+    with _DB_LOCK:
+        rows = _db().execute(
+            "SELECT path, item_type, item_index, record_id FROM takes WHERE sha256 = ? ORDER BY created_at",
+            (sha256,),
+        ).fetchall()
+    for path, item_type, index, record_id in _forget_missing(rows):
+        return TakeMatch(Path(path), item_type, int(index), record_id, "exact", 0.0)
+    return None
+
+
+def find_similar(fingerprint: Fingerprint, duration_sec: float) -> TakeMatch | None:
+    slack = max(DURATION_SLACK_SEC, duration_sec * DURATION_TOLERANCE)
+    with _DB_LOCK:
+        rows = _db().execute(
+            "SELECT path, item_type, item_index, record_id, fingerprint FROM takes "
+            "WHERE fingerprint IS NOT NULL AND duration_sec BETWEEN ? AND ?",
+            (duration_sec - slack, duration_sec + slack),
+        ).fetchall()
+    best: TakeMatch | None = None
+    for path, item_type, index, record_id, blob in _forget_missing(rows):
+        rate = bit_error_rate(fingerprint, Fingerprint.from_blob(blob))
+        if rate <= MAX_BIT_ERROR_RATE and (best is None or rate < best.bit_error_rate):
+            best = TakeMatch(Path(path), item_type, int(index), record_id, "perceptual", rate)
+    return best
+
+
+def register(
+    path: Path,
+    item_type: str,
+    index: int,
+    record_id: str,
+    sha256: str,
+    duration_sec: float,
+    fingerprint: Fingerprint | None,
+) -> None:
+    with _DB_LOCK:
+        conn = _db()
+        conn.execute(
+            "INSERT OR REPLACE INTO takes(path, item_type, item_index, record_id, sha256, duration_sec, fingerprint, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(path.resolve()),
+                item_type,
+                index,
+                record_id,
+                sha256,
+                duration_sec,
+                fingerprint.to_blob() if fingerprint is not None else None,
+                time.time(),
+            ),
+        )
+        conn.commit()
+
+
+def move(old_path: Path, new_path: Path) -> None:
+    """Follow a take to its new file; the hash of the original upload is kept for exact matches."""
+    with _DB_LOCK:
+        conn = _db()
+        conn.execute("UPDATE takes SET path = ? WHERE path = ?", (str(new_path.resolve()), str(old_path.resolve())))
+        conn.commit()
+
+
+def stats() -> dict[str, Any]:
+    with _DB_LOCK:
+        takes, perceptual = _db().execute("SELECT COUNT(*), COUNT(fingerprint) FROM takes").fetchone()
+    return {"takes": int(takes), "with_fingerprint": int(perceptual)}
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from .config import load_runtime_settings
+from .services import (
+    FileBusyError,
+    claim_path,
+    list_inbox_audio,
+    path_key,
+    process_audio_file,
+    processing_pool,
+    release_path,
+)
+
+logger = logging.getLogger(__name__)
+
+JOB_HISTORY_LIMIT = 1000
+ACTIVE_STATES = ("queued", "running")
+
+
+@dataclass
+class Job:
+    id: str
+    path: str
+    state: str = "queued"
+    stage: str = "queued"
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    started_at: str = ""
+    finished_at: str = ""
+    stage_ms: dict[str, float] = field(default_factory=dict)
+    timing_ms: dict[str, float] = field(default_factory=dict)
+    result: dict[str, Any] | None = None
+    error: str = ""
+    _stage_started: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "path": self.path,
+            "state": self.state,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "stage_ms": dict(self.stage_ms),
+            "timing_ms": dict(self.timing_ms),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Background processing jobs with one `process_audio_file` call per job."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._jobs: dict[str, Job] = {}
+        self._active_by_path: dict[str, str] = {}
+
+    def submit(self, path_value: str) -> dict[str, Any]:
+        """Queue a file; a file that is already queued or running returns its existing job.
+
+        Raises FileBusyError while a synchronous scan or process request has the file.
+        """
+        key = path_key(path_value)
+        with self._lock:
+            existing_id = self._active_by_path.get(key)
+            if existing_id is not None:
+                return self._jobs[existing_id].to_dict()
+            if not claim_path(key):
+                raise FileBusyError(f"Already being processed: {path_value}")
+            job = Job(id=str(uuid.uuid4()), path=path_value)
+            self._jobs[job.id] = job
+            self._active_by_path[key] = job.id
+            self._prune()
+            snapshot = job.to_dict()
+
+        try:
+            processing_pool(load_runtime_settings()).submit(self._run, job, key)
+        except Exception as exc:
+            # E.g. the pool was shut down while being replaced; never leave the path claimed.
+            logger.exception("Failed to queue job: id=%s path=%s", job.id, job.path)
+            with self._lock:
+                job.state = "failed"
+                job.stage = "failed"
+                job.error = str(exc)
+                job.finished_at = datetime.now().isoformat(timespec="seconds")
+                self._active_by_path.pop(key, None)
+                snapshot = job.to_dict()
+            release_path(key)
+        return snapshot
+
+    def submit_scan(self) -> dict[str, Any]:
+        jobs: list[dict[str, Any]] = []
+        for file in list_inbox_audio():
+            try:
+                jobs.append(self.submit(str(file)))
+            except FileBusyError:
+                continue
+        return {"queued": len(jobs), "jobs": [job["id"] for job in jobs]}
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def list(self, limit: int = 100, state: str | None = None) -> list[dict[str, Any]]:
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if state is None or job.state == state]
+            return [job.to_dict() for job in reversed(jobs[-limit:])]
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            counts: dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.state] = counts.get(job.state, 0) + 1
+            return counts
+
+    def _set_stage(self, job: Job, stage: str) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            if job._stage_started:
+                job.stage_ms[job.stage] = round(job.stage_ms.get(job.stage, 0.0) + (now - job._stage_started) * 1000, 2)
+            job.stage = stage
+            job._stage_started = now
+
+    def _run(self, job: Job, key: str) -> None:
+        with self._lock:
+            job.state = "running"
+            job.started_at = datetime.now().isoformat(timespec="seconds")
+        try:
+            record = process_audio_file(job.path, progress=lambda stage: self._set_stage(job, stage))
+        except Exception as exc:
+            logger.exception("Job failed: id=%s path=%s", job.id, job.path)
+            self._set_stage(job, "failed")
+            with self._lock:
+                job.state = "failed"
+                job.error = str(exc)
+        else:
+            self._set_stage(job, "done")
+            with self._lock:
+                job.state = "succeeded"
+                job.timing_ms = dict(record.get("asr", {}).get("debug", {}).get("timing_ms", {}))
+                job.result = {
+                    "id": record["id"],
+                    "tag": record["tag"],
+                    "needs_review": record["needs_review"],
+                    "library_path": record["library_path"],
+                }
+        finally:
+            with self._lock:
+                job.finished_at = datetime.now().isoformat(timespec="seconds")
+                self._active_by_path.pop(key, None)
+            release_path(key)
+
+    def _prune(self) -> None:
+        # Caller holds the lock. Dicts keep insertion order, so the oldest jobs come first.
+        overflow = len(self._jobs) - JOB_HISTORY_LIMIT
+        if overflow <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.state not in ACTIVE_STATES][:overflow]:
+            del self._jobs[job_id]
+
+
+JOBS = JobManager()
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import bisect
+import re
+import threading
+from pathlib import Path
+from typing import Any
+
+_FOLDER_RE = re.compile(r"^([A-Z])(\d{2})_")
+
+Key = tuple[str, int]
+
+
+class LibraryIndex:
+    """In-memory map of (type, index) -> item folder and its take files.
+
+    Built from one directory walk, then kept current by the archive path.
+    `rescan()` reconciles it with edits made outside the app.
+    """
+
+    def __init__(self, type_dirs: dict[str, Path], type_codes: dict[str, str]) -> None:
+        self._type_dirs = type_dirs
+        self._code_to_type = {code: item_type for item_type, code in type_codes.items()}
+        self._lock = threading.RLock()
+        self._folders: dict[Key, Path] = {}
+        # Take names sorted ascending; names embed the timestamp, so the tail is the newest.
+        self._takes: dict[Key, list[str]] = {}
+        self._built = False
+
+    def _walk(self) -> tuple[dict[Key, Path], dict[Key, list[str]]]:
+        folders: dict[Key, Path] = {}
+        takes: dict[Key, list[str]] = {}
+        for item_type, base in self._type_dirs.items():
+            if not base.exists():
+                continue
+            for folder in sorted(base.iterdir()):
+                match = _FOLDER_RE.match(folder.name)
+                if not folder.is_dir() or not match:
+                    continue
+                if self._code_to_type.get(match.group(1)) != item_type:
+                    continue
+                key = (item_type, int(match.group(2)))
+                if key in folders:
+                    # Same rule as the glob lookup: the first folder in name order wins.
+                    continue
+                folders[key] = folder
+                takes[key] = sorted(p.name for p in folder.glob("take_*") if p.is_file())
+        return folders, takes
+
+    def _ensure_built(self) -> None:
+        if not self._built:
+            self._folders, self._takes = self._walk()
+            self._built = True
+
+    def build(self) -> None:
+        with self._lock:
+            self._folders, self._takes = self._walk()
+            self._built = True
+
+    def folder(self, item_type: str, index: int) -> Path | None:
+        with self._lock:
+            self._ensure_built()
+            return self._folders.get((item_type, index))
+
+    def set_folder(self, item_type: str, index: int, folder: Path) -> None:
+        with self._lock:
+            self._ensure_built()
+            key = (item_type, index)
+            if key not in self._folders:
+                self._folders[key] = folder
+                self._takes[key] = sorted(p.name for p in folder.glob("take_*") if p.is_file())
+
+    def takes(self, item_type: str, index: int) -> list[Path]:
+        """Take paths for one item, newest first."""
+        with self._lock:
+            self._ensure_built()
+            key = (item_type, index)
+            folder = self._folders.get(key)
+            if folder is None:
+                return []
+            return [folder / name for name in reversed(self._takes.get(key, []))]
+
+    def take_names(self, item_type: str, index: int) -> tuple[Path | None, list[str]]:
+        """(item folder, take names newest first) without building a path per take."""
+        with self._lock:
+            self._ensure_built()
+            key = (item_type, index)
+            return self._folders.get(key), list(reversed(self._takes.get(key, [])))
+
+    def take_count(self, item_type: str, index: int) -> tuple[int, str]:
+        """(number of takes, newest take name) without building path objects."""
+        with self._lock:
+            self._ensure_built()
+            names = self._takes.get((item_type, index), [])
+            return len(names), (names[-1] if names else "")
+
+    def add_take(self, item_type: str, index: int, take_path: Path) -> None:
+        with self._lock:
+            self._ensure_built()
+            key = (item_type, index)
+            self._folders.setdefault(key, take_path.parent)
+            names = self._takes.setdefault(key, [])
+            pos = bisect.bisect_left(names, take_path.name)
+            if pos >= len(names) or names[pos] != take_path.name:
+                names.insert(pos, take_path.name)
+
+    def remove_take(self, item_type: str, index: int, take_path: Path) -> None:
+        with self._lock:
+            self._ensure_built()
+            names = self._takes.get((item_type, index), [])
+            pos = bisect.bisect_left(names, take_path.name)
+            if pos < len(names) and names[pos] == take_path.name:
+                del names[pos]
+
+    @staticmethod
+    def _entries(folders: dict[Key, Path], takes: dict[Key, list[str]]) -> set[str]:
+        return {
+            f"{folder.parent.name}/{folder.name}/{name}"
+            for key, folder in folders.items()
+            for name in takes.get(key, [])
+        }
+
+    def rescan(self, apply: bool = True) -> dict[str, Any]:
+        """Compare the index with the disk; replace it with the disk view when `apply`."""
+        folders, takes = self._walk()
+        on_disk = self._entries(folders, takes)
+        with self._lock:
+            self._ensure_built()
+            indexed = self._entries(self._folders, self._takes)
+            if apply:
+                self._folders, self._takes = folders, takes
+        added = sorted(on_disk - indexed)
+        removed = sorted(indexed - on_disk)
+        return {
+            "applied": apply,
+            "in_sync": not added and not removed,
+            "added": added,
+            "removed": removed,
+            "folders": len(folders),
+            "takes": len(on_disk),
+        }
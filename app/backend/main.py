@@ -1,21 +1,31 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import itertools
 import json
 import logging
 import os
+import random
 import subprocess
 import tempfile
+import threading
+import time
 from dataclasses import replace
 from pathlib import Path
 from typing import Any
 
-from fastapi import FastAPI, File, HTTPException, Query, UploadFile
-from fastapi.responses import FileResponse, RedirectResponse
+from fastapi import FastAPI, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import FileResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
-from .config import INBOX_DIR, PROJECT_ROOT, ensure_bootstrap, load_runtime_settings
-from .asr import transcribe_for_scope
+from . import asr_cache, fingerprint, metrics, profiling
+from .config import INBOX_DIR, PROJECT_ROOT, VAULT_ROOT, ensure_bootstrap, load_runtime_settings
+from .asr import batch_stats, model_status, preload_models, transcribe_for_scope
+from .jobs import JOBS
+from .probe import safe_probe_audio
+from .watcher import InboxWatcher
 from .schemas import (
     DailyBuildRequest,
     MappingsUpdateRequest,
@@ -24,23 +34,34 @@ from .schemas import (
     TeacherParseRequest,
 )
 from .services import (
+    FileBusyError,
+    archive_stats,
     build_daily_package,
+    exclusive_path,
+    iter_daily_zip,
     library_summary,
     library_takes,
+    list_inbox_audio,
     list_recent_items,
     load_mappings,
     parse_teacher_command,
     preview_tag_for_text,
     process_audio_file,
     relabel_item,
+    rescan_library,
     save_mappings,
     scan_inbox,
+    warm_library_index,
+    warm_processing_pool,
 )
 
 app = FastAPI(title="Homework Audio Agent API", version="0.1.0")
 FRONTEND_DIR = PROJECT_ROOT / "app" / "frontend"
-VAULT_ROOT = (PROJECT_ROOT / "HomeworkVault").resolve()
 STRUCTURED_DIR = (PROJECT_ROOT / "originalText" / "structured").resolve()
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+_INBOX_WATCHER: InboxWatcher | None = None
 
 app.add_middleware(
     CORSMiddleware,
@@ -51,6 +72,145 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def _record_request_latency(request: Request, call_next: Any) -> Any:
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template (/api/jobs/{job_id}), not the raw path, to keep cardinality bounded.
+        route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started, method=request.method, route=route, status=str(status)
+        )
+
+
+_PROFILE_EXEMPT_PREFIXES = ("/metrics", "/api/profiles")
+_PROFILE_MAX_OVERLAPS = 50
+# Requests inside the app (by serial), and for each profile being recorded the
+# other requests seen meanwhile. Only the event loop touches these.
+_REQUEST_SERIAL = itertools.count(1)
+_IN_FLIGHT: dict[int, str] = {}
+_PROFILE_OVERLAPS: dict[int, list[str]] = {}
+
+
+def _profile_trigger(request: Request, runtime: Any) -> str | None:
+    path = request.url.path
+    if path.startswith(_PROFILE_EXEMPT_PREFIXES):
+        return None
+    if runtime.profile_on_demand:
+        if request.headers.get("x-profile", "").strip().lower() in {"1", "true", "yes", "on"}:
+            return "header"
+        if request.query_params.get("profile", "").strip().lower() in {"1", "true", "yes", "on"}:
+            return "query"
+    if runtime.profile_sample_rate > 0 and random.random() < runtime.profile_sample_rate:
+        return "sample"
+    return None
+
+
+@app.middleware("http")
+async def _profile_request(request: Request, call_next: Any) -> Any:
+    serial = next(_REQUEST_SERIAL)
+    label = f"{request.method} {request.url.path}"
+    for overlaps in _PROFILE_OVERLAPS.values():
+        overlaps.append(label)
+    _IN_FLIGHT[serial] = label
+    try:
+        runtime = load_runtime_settings()
+        trigger = _profile_trigger(request, runtime)
+        if trigger is None:
+            return await call_next(request)
+        return await _profiled(request, call_next, runtime, trigger, serial)
+    finally:
+        _IN_FLIGHT.pop(serial, None)
+
+
+async def _profiled(request: Request, call_next: Any, runtime: Any, trigger: str, serial: int) -> Any:
+    # The sampler sees every thread, so work of overlapping requests and
+    # background jobs ends up in the profile too; the metadata names it.
+    overlaps = [label for other, label in _IN_FLIGHT.items() if other != serial]
+    _PROFILE_OVERLAPS[serial] = overlaps
+    running_jobs = JOBS.counts().get("running", 0)
+    profiler = profiling.SamplingProfiler(runtime.profile_interval_ms)
+    started = time.perf_counter()
+    status = 500
+    profiler.start()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        # Streaming bodies (ZIP downloads) are sent after this point and are not covered.
+        profiler.stop()
+        _PROFILE_OVERLAPS.pop(serial, None)
+        meta = {
+            "method": request.method,
+            "path": request.url.path,
+            "route": getattr(request.scope.get("route"), "path", None) or "unmatched",
+            "status": status,
+            "trigger": trigger,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "concurrent_requests": overlaps[:_PROFILE_MAX_OVERLAPS],
+            "concurrent_total": len(overlaps),
+            "running_jobs": max(running_jobs, JOBS.counts().get("running", 0)),
+        }
+        try:
+            profile_id = await asyncio.to_thread(profiling.save_profile, profiler, meta, runtime.profile_keep)
+        except OSError:
+            logger.exception("Failed to save request profile")
+            profile_id = ""
+    if profile_id:
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+def _asr_cache_samples(field: str) -> list[tuple[dict[str, str], float]]:
+    return [({}, float(asr_cache.stats().get(field, 0)))]
+
+
+metrics.register(
+    metrics.CallbackMetric(
+        "homework_jobs",
+        "Background jobs by state (queued/running are the queue depth).",
+        lambda: [({"state": state}, float(n)) for state, n in sorted(JOBS.counts().items())],
+    )
+)
+metrics.register(
+    metrics.CallbackMetric(
+        "homework_inbox_files",
+        "Audio files currently waiting in the Inbox.",
+        lambda: [({}, float(len(list_inbox_audio())))],
+    )
+)
+metrics.register(
+    metrics.CallbackMetric(
+        "homework_asr_cache_hits_total", "ASR cache hits.", lambda: _asr_cache_samples("hits"), kind="counter"
+    )
+)
+metrics.register(
+    metrics.CallbackMetric(
+        "homework_asr_cache_misses_total", "ASR cache misses.", lambda: _asr_cache_samples("misses"), kind="counter"
+    )
+)
+metrics.register(
+    metrics.CallbackMetric(
+        "homework_asr_cache_evictions_total",
+        "ASR cache LRU evictions.",
+        lambda: _asr_cache_samples("evictions"),
+        kind="counter",
+    )
+)
+metrics.register(
+    metrics.CallbackMetric(
+        "homework_model_resident_megabytes",
+        "Estimated resident size of loaded ASR models.",
+        lambda: [({}, float(model_status(load_runtime_settings()).get("resident_mb", 0.0)))],
+    )
+)
+
+
 @app.on_event("startup")
 def _startup() -> None:
     logging.basicConfig(
@@ -58,6 +218,32 @@ def _startup() -> None:
         format="%(asctime)s %(levelname)s %(name)s %(message)s",
     )
     ensure_bootstrap()
+    warm_library_index()
+
+    global _INBOX_WATCHER
+    runtime = load_runtime_settings()
+    # Load models off the startup path; requests that need one meanwhile wait for it.
+    threading.Thread(target=_warm_models, args=(runtime,), name="model-preload", daemon=True).start()
+    if runtime.inbox_watch and _INBOX_WATCHER is None:
+        _INBOX_WATCHER = InboxWatcher(
+            JOBS.submit,
+            poll_ms=runtime.inbox_watch_poll_ms,
+            settle_ms=runtime.inbox_watch_settle_ms,
+        )
+        _INBOX_WATCHER.start()
+
+
+def _warm_models(runtime: Any) -> None:
+    preload_models(runtime)
+    warm_processing_pool(runtime)
+
+
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    global _INBOX_WATCHER
+    if _INBOX_WATCHER is not None:
+        _INBOX_WATCHER.stop()
+        _INBOX_WATCHER = None
 
 
 if FRONTEND_DIR.exists():
@@ -77,6 +263,29 @@ def ui_page() -> FileResponse:
     return FileResponse(index_path)
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/api/profiles")
+def profiles_list(limit: int = Query(default=100, ge=1, le=1000)) -> list[dict[str, Any]]:
+    return profiling.list_profiles(limit=limit)
+
+
+@app.get("/api/profiles/{profile_id}")
+def profiles_get(
+    profile_id: str,
+    format: str = Query(default="json", pattern="^(json|folded)$"),
+) -> FileResponse:
+    try:
+        path = profiling.profile_path(profile_id, format)
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {profile_id}") from exc
+    media_type = "application/json" if format == "json" else "text/plain; charset=utf-8"
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
+
 @app.get("/api/health")
 def health() -> dict[str, Any]:
     from datetime import datetime, timezone
@@ -89,43 +298,121 @@ def health() -> dict[str, Any]:
         "asr_process_scope": runtime.asr_process_scope,
         "whisper_model": runtime.whisper_model,
         "asr_tag_window_sec": runtime.asr_tag_window_sec,
+        "asr_cache": asr_cache.stats(runtime.asr_cache_max_mb),
+        "take_index": fingerprint.stats(),
+        "archive": archive_stats(),
+        "inbox_watcher": _INBOX_WATCHER.status() if _INBOX_WATCHER else {"running": False},
+        "jobs": JOBS.counts(),
+        "models": model_status(runtime),
+        "asr_batch": batch_stats(),
     }
 
 
+def _safe_filename(name: str) -> str:
+    safe_name = Path(name).name
+    return "".join(ch if ch not in '\\/:*?"<>|' else "_" for ch in safe_name)
+
+
+async def _stream_upload(file: UploadFile, target: Path, max_mb: int) -> tuple[int, str]:
+    """Copy an upload to `target` chunk by chunk, hashing on the way; returns (size, sha256)."""
+    max_bytes = max_mb * 1024 * 1024
+    fd, tmp_name = tempfile.mkstemp(prefix=".upload_", suffix=".part", dir=str(target.parent))
+    tmp_path = Path(tmp_name)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File too large (limit {max_mb} MB): {file.filename}")
+                digest.update(chunk)
+                out.write(chunk)
+        os.replace(tmp_path, target)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
+
+
 @app.post("/api/inbox/upload")
 async def inbox_upload(files: list[UploadFile] = File(...)) -> dict[str, Any]:
     ensure_bootstrap()
-    saved: list[dict[str, str]] = []
+    runtime = load_runtime_settings()
+    saved: list[dict[str, Any]] = []
     for file in files:
         if not file.filename:
             continue
-        target = INBOX_DIR / file.filename
-        data = await file.read()
-        target.write_bytes(data)
-        saved.append({"name": file.filename, "path": str(target.relative_to(PROJECT_ROOT))})
+        target = INBOX_DIR / _safe_filename(file.filename)
+        size, sha256 = await _stream_upload(file, target, runtime.upload_max_mb)
+        if runtime.take_dedup or runtime.asr_cache_max_mb > 0:
+            # Saves hashing the file again for the take index or the ASR cache.
+            asr_cache.remember_file_hash(target, sha256)
+        saved.append(
+            {
+                "name": target.name,
+                "path": str(target.relative_to(PROJECT_ROOT)),
+                "size": size,
+                "sha256": sha256,
+            }
+        )
     return {"saved": saved}
 
 
 @app.post("/api/inbox/scan")
-def inbox_scan() -> dict[str, int]:
+def inbox_scan(background: bool = Query(default=False)) -> dict[str, Any]:
+    if background:
+        return JOBS.submit_scan()
     return scan_inbox()
 
 
 @app.get("/api/inbox/items")
-def inbox_items() -> list[dict[str, Any]]:
-    return list_recent_items()
+def inbox_items(
+    limit: int = Query(default=200, ge=1, le=5000),
+    needs_review: bool | None = Query(default=None),
+) -> list[dict[str, Any]]:
+    return list_recent_items(limit=limit, needs_review=needs_review)
 
 
 @app.post("/api/audio/process")
-def audio_process(payload: ProcessAudioRequest) -> dict[str, Any]:
+def audio_process(payload: ProcessAudioRequest, background: bool = Query(default=False)) -> dict[str, Any]:
     try:
-        return process_audio_file(payload.path)
+        if background:
+            return JOBS.submit(payload.path)
+        with exclusive_path(payload.path):
+            return process_audio_file(payload.path)
+    except FileBusyError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
     except FileNotFoundError as exc:
         raise HTTPException(status_code=404, detail=f"File not found: {exc}") from exc
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+@app.post("/api/jobs")
+def jobs_submit(payload: ProcessAudioRequest) -> dict[str, Any]:
+    try:
+        return JOBS.submit(payload.path)
+    except FileBusyError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+
+@app.get("/api/jobs")
+def jobs_list(
+    state: str | None = Query(default=None, pattern="^(queued|running|succeeded|failed)$"),
+    limit: int = Query(default=100, ge=1, le=1000),
+) -> list[dict[str, Any]]:
+    return JOBS.list(limit=limit, state=state)
+
+
+@app.get("/api/jobs/{job_id}")
+def jobs_get(job_id: str) -> dict[str, Any]:
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
 @app.post("/api/audio/relabel")
 def audio_relabel(payload: RelabelRequest) -> dict[str, Any]:
     try:
@@ -148,7 +435,7 @@ def audio_relabel(payload: RelabelRequest) -> dict[str, Any]:
 async def asr_test(
     file: UploadFile = File(...),
     tag_window_sec: int | None = Query(default=None, ge=1),
-    scope: str = Query(default="full", pattern="^(full|head|hybrid)$"),
+    scope: str = Query(default="full", pattern="^(full|head|hybrid|adaptive)$"),
 ) -> dict[str, Any]:
     if not file.filename:
         raise HTTPException(status_code=400, detail="Missing filename")
@@ -157,34 +444,57 @@ async def asr_test(
     if tag_window_sec is not None:
         runtime = replace(runtime, asr_tag_window_sec=tag_window_sec)
 
-    safe_name = Path(file.filename).name
-    safe_name = "".join(ch if ch not in '\\/:*?"<>|' else "_" for ch in safe_name)
+    safe_name = _safe_filename(file.filename)
 
     try:
         with tempfile.TemporaryDirectory(prefix="asr_test_") as tmp_dir:
             temp_path = Path(tmp_dir) / safe_name
-            temp_path.write_bytes(await file.read())
-            asr_result, head_text, debug = transcribe_for_scope(temp_path, runtime, scope=scope)
+            # The temp file is gone after the request, so its hash is passed along, not recorded.
+            _, sha256 = await _stream_upload(file, temp_path, runtime.upload_max_mb)
+            info = safe_probe_audio(temp_path)
+            asr_result, head_text, debug = transcribe_for_scope(
+                temp_path,
+                runtime,
+                scope=scope,
+                tag_confidence=lambda text: preview_tag_for_text(text)["confidence"],
+                info=info,
+                probed=True,
+                audio_sha256=sha256,
+            )
             tag_preview = preview_tag_for_text(head_text or asr_result.text)
             return {
                 "engine": asr_result.engine,
                 "lang": asr_result.lang,
-                "duration_sec": asr_result.duration_sec,
+                "duration_sec": info.duration_sec if info is not None else asr_result.duration_sec,
+                "audio": info.to_dict() if info is not None else None,
                 "scope": debug["scope"],
                 "used_head_clip": debug["used_head_clip"],
                 "fallback_to_full": debug["fallback_to_full"],
+                "low_confidence": debug.get("low_confidence"),
+                "speech_onset_sec": debug.get("speech_onset_sec"),
+                "route": debug.get("route"),
+                "chunks": debug.get("chunks"),
+                "cache": debug.get("cache", "off"),
                 "timing_ms": debug["timing_ms"],
                 "asr_text": asr_result.text,
                 "tag_window_text": head_text,
                 "segments": asr_result.segments,
                 "tag_preview": tag_preview,
             }
+    except HTTPException:
+        raise
     except RuntimeError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+@app.get("/api/asr/cache")
+def asr_cache_stats() -> dict[str, Any]:
+    runtime = load_runtime_settings()
+    return asr_cache.stats(runtime.asr_cache_max_mb)
+
+
 def _resolve_vault_file(path: str) -> Path:
     candidate = Path(path)
     if candidate.is_absolute():
@@ -192,7 +502,7 @@ def _resolve_vault_file(path: str) -> Path:
     target = (PROJECT_ROOT / candidate).resolve()
     try:
         target.relative_to(PROJECT_ROOT.resolve())
-        target.relative_to(VAULT_ROOT)
+        target.relative_to(VAULT_ROOT.resolve())
     except ValueError as exc:
         raise HTTPException(status_code=403, detail="Access denied") from exc
     return target
@@ -300,6 +610,11 @@ def get_library_takes(item_type: str = Query(..., alias="type"), index: int = Qu
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+@app.post("/api/library/rescan")
+def post_library_rescan(verify_only: bool = Query(default=False)) -> dict[str, Any]:
+    return rescan_library(apply=not verify_only)
+
+
 @app.post("/api/teacher/parse")
 def teacher_parse(payload: TeacherParseRequest) -> dict[str, Any]:
     return parse_teacher_command(payload.text)
@@ -312,6 +627,7 @@ def daily_build(payload: DailyBuildRequest) -> dict[str, Any]:
             date_str=payload.date,
             teacher_cmd=payload.teacher_cmd,
             needs=payload.needs,
+            link_mode=payload.link_mode.value if payload.link_mode else None,
         )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
@@ -319,6 +635,24 @@ def daily_build(payload: DailyBuildRequest) -> dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+@app.get("/api/daily/zip")
+def daily_zip(
+    date: str = Query(..., description="YYYY-MM-DD"),
+    teacher_cmd: str | None = Query(default=None, description="Defaults to the command of the last build for that date"),
+) -> StreamingResponse:
+    try:
+        chunks = iter_daily_zip(date, teacher_cmd)
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return StreamingResponse(
+        chunks,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="daily_{date}.zip"'},
+    )
+
+
 @app.get("/api/config/mappings")
 def config_get() -> dict[str, Any]:
     return load_mappings()
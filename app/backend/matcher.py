@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+TYPE_ORDER = ("VOCAB", "SENTENCE", "FASTSTORY")
+
+
+@dataclass(frozen=True)
+class SynonymHit:
+    kind: str  # "type" for GLOBAL_SYNONYMS keywords, "title" for item synonyms
+    rank: tuple[int, ...]
+    item_type: str
+    index: int
+    text: str
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher: one pass over the text finds every pattern."""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+        self.patterns: list[str] = []
+        for pattern in patterns:
+            self._add(pattern)
+        self._link()
+
+    def _add(self, pattern: str) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _link(self) -> None:
+        queue: deque[int] = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> set[int]:
+        """Ids of the patterns occurring anywhere in `text`."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: set[int] = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class SynonymMatcher:
+    """Type keywords and item synonyms from mappings.json compiled into one automaton.
+
+    Every hit carries a rank that reproduces the old nested-loop order
+    (type, then item, then synonym position), so callers can keep the
+    "first match wins" rules while scanning the text only once.
+    """
+
+    def __init__(self, mappings: dict[str, Any], type_keywords: dict[str, list[str]]) -> None:
+        entries: dict[str, list[SynonymHit]] = {}
+
+        for type_pos, item_type in enumerate(TYPE_ORDER):
+            for kw_pos, kw in enumerate(type_keywords.get(item_type, [])):
+                if kw:
+                    entries.setdefault(kw, []).append(SynonymHit("type", (type_pos, kw_pos), item_type, 0, kw))
+
+        for type_pos, item_type in enumerate(TYPE_ORDER):
+            items = mappings.get(item_type, {}).get("items", {})
+            for item_pos, (idx_str, item) in enumerate(items.items()):
+                for syn_pos, syn in enumerate(item.get("synonyms", [])):
+                    syn_text = str(syn).strip()
+                    if not syn_text or syn_text.isdigit():
+                        continue
+                    entries.setdefault(syn_text.lower(), []).append(
+                        SynonymHit("title", (type_pos, item_pos, syn_pos), item_type, int(idx_str), syn_text)
+                    )
+
+        self._automaton = AhoCorasick(entries)
+        self._entries = [entries[pattern] for pattern in self._automaton.patterns]
+
+    def hits(self, lower_text: str) -> list[SynonymHit]:
+        """All hits in `lower_text` (already lower-cased), best-ranked first within each kind."""
+        found = [hit for pid in self._automaton.find(lower_text) for hit in self._entries[pid]]
+        found.sort(key=lambda hit: (hit.kind, hit.rank))
+        return found
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from typing import Callable, Iterable, TypeVar
+
+# Prometheus text exposition format 0.0.4, without the client library.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = tuple[str, ...]
+Sample = tuple[dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self._lock = threading.Lock()
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        if not values and not self.label_names:
+            values = [((), 0.0)]
+        lines += [f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...], labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label values -> (per-bucket counts, sum, count); counts are not cumulative here
+        self._series: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        pos = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+                self._series[key] = series
+            series[0][pos] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            snapshot = sorted((key, (list(counts), list(totals))) for key, (counts, totals) in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, (total, count)) in snapshot:
+            running = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                running += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {_number(count)}")
+        return lines
+
+
+class CallbackMetric:
+    """Read at scrape time from `collect()`, which returns (labels, value) samples.
+
+    For values owned elsewhere (job queue, ASR cache stats); `kind` is the
+    exposed type, "gauge" or "counter".
+    """
+
+    def __init__(self, name: str, help_text: str, collect: Callable[[], list[Sample]], kind: str = "gauge") -> None:
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._collect = collect
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in self._collect():
+            lines.append(f"{self.name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        return lines
+
+
+_REGISTRY: list[Counter | Histogram | CallbackMetric] = []
+_REGISTRY_LOCK = threading.Lock()
+
+MetricT = TypeVar("MetricT", Counter, Histogram, CallbackMetric)
+
+
+def register(metric: MetricT) -> MetricT:
+    with _REGISTRY_LOCK:
+        _REGISTRY[:] = [existing for existing in _REGISTRY if existing.name != metric.name]
+        _REGISTRY.append(metric)
+    return metric
+
+
+def render() -> str:
+    with _REGISTRY_LOCK:
+        metrics = list(_REGISTRY)
+    lines: list[str] = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONFIDENCE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.75, 0.8, 0.9, 0.95, 1.0)
+
+STAGE_SECONDS = register(
+    Histogram(
+        "homework_stage_seconds",
+        "Pipeline stage latency (ASR stages from asr_debug.timing_ms, tag, archive, daily_build).",
+        STAGE_BUCKETS,
+        labels=("stage",),
+    )
+)
+FILES_PROCESSED = register(Counter("homework_files_processed_total", "Audio files processed successfully."))
+FILES_FAILED = register(Counter("homework_files_failed_total", "Audio files whose processing raised an error."))
+FILES_NEEDS_REVIEW = register(
+    Counter("homework_files_needs_review_total", "Processed files left in the Inbox for manual review.")
+)
+FILES_DUPLICATE = register(
+    Counter(
+        "homework_files_duplicate_total",
+        "Uploads linked to an existing Library take instead of archived again.",
+        labels=("kind",),
+    )
+)
+ARCHIVE_BYTES = register(
+    Counter(
+        "homework_archive_bytes_total",
+        "Bytes of Library takes before (source) and after (encoded) Opus compaction.",
+        labels=("kind",),
+    )
+)
+TAG_CONFIDENCE = register(
+    Histogram("homework_tag_confidence", "Tag confidence of processed files.", CONFIDENCE_BUCKETS)
+)
+HTTP_REQUEST_SECONDS = register(
+    Histogram(
+        "homework_http_request_duration_seconds",
+        "HTTP request latency by route template.",
+        HTTP_BUCKETS,
+        labels=("method", "route", "status"),
+    )
+)
+
+
+def observe_stage_ms(stage: str, elapsed_ms: float) -> None:
+    STAGE_SECONDS.observe(elapsed_ms / 1000.0, stage=stage)
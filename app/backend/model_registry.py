@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import gc
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Iterator
+
+logger = logging.getLogger(__name__)
+
+Key = tuple[Hashable, int]  # (model name or spec, worker slot)
+
+
+@dataclass
+class _Entry:
+    name: Any
+    slot: int
+    # Held while loading and for every inference: whisper models are not re-entrant.
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    model: Any = None
+    state: str = "unloaded"  # unloaded | loading | ready | failed
+    size_bytes: int = 0
+    load_ms: float = 0.0
+    warmup_ms: float = 0.0
+    loaded_at: float = 0.0
+    last_used: float = 0.0
+    uses: int = 0
+    error: str = ""
+
+    def to_dict(self, now: float) -> dict[str, Any]:
+        return {
+            "name": str(self.name),
+            "slot": self.slot,
+            "state": self.state,
+            "size_mb": round(self.size_bytes / (1024 * 1024), 1),
+            "load_ms": self.load_ms,
+            "warmup_ms": self.warmup_ms,
+            "idle_sec": round(now - self.last_used, 1) if self.model is not None else None,
+            "uses": self.uses,
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    """Loaded models keyed by (name, worker slot), unloaded when idle or over budget.
+
+    `loader(name)` builds a model and `sizer(model)` estimates its resident bytes;
+    `name` is any hashable that fully describes the model to load.
+    A model is only unloaded while nobody holds it, so eviction never interrupts
+    an inference; the next `use()` simply loads it again.
+    """
+
+    def __init__(self, loader: Callable[[Any], Any], sizer: Callable[[Any], int]) -> None:
+        self._loader = loader
+        self._sizer = sizer
+        self._lock = threading.Lock()
+        self._entries: dict[Key, _Entry] = {}
+        self._idle_ttl_sec = 0.0
+        self._max_bytes = 0
+        self._reaper: threading.Thread | None = None
+        self._reaper_stop = threading.Event()
+
+    def configure(self, idle_ttl_sec: float, max_mb: int) -> None:
+        """Set the idle TTL (0 = never) and memory budget (0 = unlimited)."""
+        self._idle_ttl_sec = max(0.0, float(idle_ttl_sec))
+        self._max_bytes = max(0, int(max_mb)) * 1024 * 1024
+        if self._idle_ttl_sec > 0:
+            self._start_reaper()
+
+    def _entry(self, key: Key) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(name=key[0], slot=key[1])
+                self._entries[key] = entry
+            return entry
+
+    def _load_locked(self, entry: _Entry, warmup: Callable[[Any], None] | None) -> None:
+        # Caller holds entry.lock.
+        entry.state = "loading"
+        entry.error = ""
+        started = time.perf_counter()
+        try:
+            model = self._loader(entry.name)
+        except Exception as exc:
+            entry.state = "failed"
+            entry.error = str(exc)
+            raise
+        entry.load_ms = round((time.perf_counter() - started) * 1000, 2)
+        entry.warmup_ms = 0.0
+        if warmup is not None:
+            started = time.perf_counter()
+            try:
+                warmup(model)
+            except Exception:
+                logger.warning("Warmup failed for model %s (slot %s)", entry.name, entry.slot, exc_info=True)
+            entry.warmup_ms = round((time.perf_counter() - started) * 1000, 2)
+        try:
+            entry.size_bytes = int(self._sizer(model))
+        except Exception:
+            entry.size_bytes = 0
+        entry.model = model
+        entry.state = "ready"
+        entry.loaded_at = entry.last_used = time.monotonic()
+        logger.info(
+            "Loaded model %s (slot %s) in %.0f ms, warmup %.0f ms, ~%.0f MB",
+            entry.name,
+            entry.slot,
+            entry.load_ms,
+            entry.warmup_ms,
+            entry.size_bytes / (1024 * 1024),
+        )
+
+    def load(self, name: Hashable, slot: int = 0, warmup: Callable[[Any], None] | None = None) -> None:
+        """Load (and optionally warm up) a model ahead of its first use."""
+        entry = self._entry((name, slot))
+        with entry.lock:
+            if entry.model is None:
+                self._load_locked(entry, warmup)
+        self._enforce_budget(keep=(name, slot))
+
+    @contextmanager
+    def use(self, name: Hashable, slot: int = 0) -> Iterator[Any]:
+        """Hold a model exclusively for one inference, loading it first if needed."""
+        entry = self._entry((name, slot))
+        loaded = False
+        with entry.lock:
+            if entry.model is None:
+                self._load_locked(entry, None)
+                loaded = True
+            entry.uses += 1
+            try:
+                yield entry.model
+            finally:
+                entry.last_used = time.monotonic()
+        if loaded:
+            self._enforce_budget(keep=(name, slot))
+
+    def _unload_locked(self, entry: _Entry, reason: str) -> None:
+        # Caller holds entry.lock.
+        logger.info("Unloading model %s (slot %s): %s", entry.name, entry.slot, reason)
+        entry.model = None
+        entry.state = "unloaded"
+        entry.size_bytes = 0
+
+    def _release_memory(self) -> None:
+        gc.collect()
+        try:
+            import torch  # type: ignore[import-not-found]
+
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def evict_idle(self) -> list[str]:
+        """Unload every model unused for longer than the idle TTL."""
+        if self._idle_ttl_sec <= 0:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._entries.values())
+        evicted: list[str] = []
+        for entry in entries:
+            if entry.model is None or now - entry.last_used < self._idle_ttl_sec:
+                continue
+            if not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.model is not None and now - entry.last_used >= self._idle_ttl_sec:
+                    self._unload_locked(entry, f"idle {now - entry.last_used:.0f}s")
+                    evicted.append(f"{entry.name}#{entry.slot}")
+            finally:
+                entry.lock.release()
+        if evicted:
+            self._release_memory()
+        return evicted
+
+    def _enforce_budget(self, keep: Key) -> None:
+        if self._max_bytes <= 0:
+            return
+        with self._lock:
+            entries = [entry for entry in self._entries.values() if entry.model is not None]
+        resident = sum(entry.size_bytes for entry in entries)
+        if resident <= self._max_bytes:
+            return
+        evicted = False
+        for entry in sorted(entries, key=lambda item: item.last_used):
+            if resident <= self._max_bytes:
+                break
+            if (entry.name, entry.slot) == keep or not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.model is not None:
+                    resident -= entry.size_bytes
+                    self._unload_locked(entry, "over memory budget")
+                    evicted = True
+            finally:
+                entry.lock.release()
+        if evicted:
+            self._release_memory()
+        if resident > self._max_bytes:
+            logger.warning(
+                "Resident models use ~%.0f MB, above the %.0f MB budget (the rest are in use)",
+                resident / (1024 * 1024),
+                self._max_bytes / (1024 * 1024),
+            )
+
+    def retire_slots(self, max_slot: int) -> list[str]:
+        """Forget the models of worker slots above `max_slot` once the pool has shrunk.
+
+        A model still held by a finishing worker is dropped when that worker releases it.
+        """
+        with self._lock:
+            retired = [self._entries.pop(key) for key in list(self._entries) if key[1] > max_slot]
+        names: list[str] = []
+        for entry in retired:
+            if entry.model is None or not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.model is not None:
+                    self._unload_locked(entry, "worker slot retired")
+                    names.append(f"{entry.name}#{entry.slot}")
+            finally:
+                entry.lock.release()
+        if names:
+            self._release_memory()
+        return names
+
+    def _start_reaper(self) -> None:
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap, name="model-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self) -> None:
+        while not self._reaper_stop.is_set():
+            interval = min(60.0, max(1.0, self._idle_ttl_sec / 4)) if self._idle_ttl_sec > 0 else 60.0
+            self._reaper_stop.wait(interval)
+            try:
+                self.evict_idle()
+            except Exception:
+                logger.exception("Model reaper failed")
+
+    def status(self) -> dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda entry: (str(entry.name), entry.slot))
+        return {
+            "idle_ttl_sec": self._idle_ttl_sec,
+            "max_mb": self._max_bytes // (1024 * 1024),
+            "resident_mb": round(sum(e.size_bytes for e in entries if e.model is not None) / (1024 * 1024), 1),
+            "models": [entry.to_dict(now) for entry in entries],
+        }
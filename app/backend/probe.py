@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import logging
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO
+
+# Container headers are read directly; nothing is decoded and ffmpeg is not needed.
+# Every parser returns None on anything it does not understand, so callers fall
+# back to the duration reported by ASR.
+
+logger = logging.getLogger(__name__)
+
+OGG_TAIL_BYTES = 64 * 1024
+MP4_MAX_MOOV_BYTES = 32 * 1024 * 1024
+ADTS_SAMPLE_FRAMES = 256
+
+_MP3_BITRATES_KBPS = {
+    # (MPEG-1?, layer) -> bitrate table indexed by the 4-bit field
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+_AAC_SAMPLE_RATES = (96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350)
+
+
+@dataclass(frozen=True)
+class AudioInfo:
+    format: str
+    duration_ms: int
+    sample_rate: int
+    channels: int
+
+    @property
+    def duration_sec(self) -> float:
+        return self.duration_ms / 1000.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "format": self.format,
+            "duration_ms": self.duration_ms,
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+        }
+
+
+def _info(fmt: str, seconds: float, sample_rate: int, channels: int) -> AudioInfo | None:
+    if seconds <= 0 or sample_rate <= 0 or channels <= 0:
+        return None
+    return AudioInfo(fmt, int(round(seconds * 1000)), sample_rate, channels)
+
+
+def probe_audio(path: Path) -> AudioInfo | None:
+    """Duration, sample rate and channels from the container header; None if unknown."""
+    try:
+        size = path.stat().st_size
+        with path.open("rb") as file_obj:
+            head = file_obj.read(16)
+            if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+                return _probe_wav(file_obj, size)
+            if head[4:8] == b"ftyp":
+                return _probe_mp4(file_obj, size)
+            if head[:4] == b"OggS":
+                return _probe_ogg(file_obj, size)
+            start = _id3v2_size(head)
+            file_obj.seek(start)
+            marker = file_obj.read(4)
+            if marker == b"fLaC":
+                return _probe_flac(file_obj)
+            if len(marker) >= 2 and marker[0] == 0xFF and marker[1] & 0xF6 == 0xF0:
+                return _probe_adts(file_obj, start, size)
+            return _probe_mp3(file_obj, start, size)
+    except (OSError, struct.error, IndexError, ValueError, ZeroDivisionError):
+        return None
+
+
+def safe_probe_audio(path: Path) -> AudioInfo | None:
+    """`probe_audio` that logs instead of raising if a parser trips on a malformed file."""
+    # Header metadata is optional: ASR still reports its own duration.
+    try:
+        return probe_audio(path)
+    except Exception:
+        logger.warning("Probe failed for %s", path, exc_info=True)
+        return None
+
+
+def _id3v2_size(head: bytes) -> int:
+    if head[:3] != b"ID3" or len(head) < 10:
+        return 0
+    # Syncsafe 28-bit size, plus the 10-byte header and an optional footer.
+    size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+    return 10 + size + (10 if head[5] & 0x10 else 0)
+
+
+def _probe_wav(file_obj: BinaryIO, size: int) -> AudioInfo | None:
+    file_obj.seek(12)
+    channels = sample_rate = byte_rate = 0
+    while True:
+        header = file_obj.read(8)
+        if len(header) < 8:
+            return None
+        chunk_id, chunk_size = header[:4], struct.unpack("<I", header[4:])[0]
+        if chunk_id == b"fmt ":
+            fmt = file_obj.read(chunk_size)
+            _, channels, sample_rate, byte_rate = struct.unpack("<HHII", fmt[:12])
+            file_obj.seek(chunk_size % 2, 1)
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # Streaming writers leave the size at 0 or 0xFFFFFFFF; use what is on disk.
+            available = size - file_obj.tell()
+            data_size = chunk_size if 0 < chunk_size <= available else available
+            return _info("wav", data_size / byte_rate, sample_rate, channels)
+        else:
+            file_obj.seek(chunk_size + chunk_size % 2, 1)
+
+
+def _probe_flac(file_obj: BinaryIO) -> AudioInfo | None:
+    header = file_obj.read(4)
+    if len(header) < 4 or header[0] & 0x7F != 0:
+        return None  # STREAMINFO must come first
+    info = file_obj.read(18)
+    packed = int.from_bytes(info[10:18], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    if not total_samples:
+        return None
+    return _info("flac", total_samples / sample_rate, sample_rate, channels)
+
+
+def _probe_ogg(file_obj: BinaryIO, size: int) -> AudioInfo | None:
+    file_obj.seek(0)
+    page = file_obj.read(27)
+    if len(page) < 27:
+        return None
+    segments = page[26]
+    table = file_obj.read(segments)
+    packet = file_obj.read(sum(table))
+    if packet[:8] == b"OpusHead":
+        channels = packet[9]
+        pre_skip = struct.unpack("<H", packet[10:12])[0]
+        sample_rate = struct.unpack("<I", packet[12:16])[0] or 48000
+        # Opus granule positions always count 48 kHz samples.
+        granule_rate, offset, fmt = 48000, pre_skip, "opus"
+    elif packet[:7] == b"\x01vorbis":
+        channels = packet[11]
+        sample_rate = struct.unpack("<I", packet[12:16])[0]
+        granule_rate, offset, fmt = sample_rate, 0, "vorbis"
+    elif packet[:5] == b"\x7fFLAC":
+        packed = int.from_bytes(packet[27:35], "big")
+        sample_rate = packed >> 44
+        channels = ((packed >> 41) & 0x7) + 1
+        granule_rate, offset, fmt = sample_rate, 0, "ogg_flac"
+    else:
+        return None
+
+    file_obj.seek(max(0, size - OGG_TAIL_BYTES))
+    tail = file_obj.read()
+    pos = tail.rfind(b"OggS")
+    while pos >= 0:
+        granule = struct.unpack("<q", tail[pos + 6 : pos + 14])[0]
+        if granule > 0:
+            return _info(fmt, (granule - offset) / granule_rate, sample_rate, channels)
+        pos = tail.rfind(b"OggS", 0, pos)
+    return None
+
+
+def _mp3_header(raw: bytes) -> tuple[bool, int, int, int, int, int] | None:
+    """(mpeg1, layer, bitrate_kbps, sample_rate, frame_bytes, channels) for a frame header."""
+    if len(raw) < 4 or raw[0] != 0xFF or raw[1] & 0xE0 != 0xE0:
+        return None
+    version = (raw[1] >> 3) & 0x3
+    layer = 4 - ((raw[1] >> 1) & 0x3)
+    bitrate_index = raw[2] >> 4
+    rate_index = (raw[2] >> 2) & 0x3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES_KBPS[(mpeg1, layer)][bitrate_index]
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (raw[2] >> 1) & 0x1
+    channels = 1 if raw[3] >> 6 == 3 else 2
+    if layer == 1:
+        frame_bytes = (12 * bitrate * 1000 // sample_rate + padding) * 4
+    else:
+        factor = 144 if mpeg1 or layer == 2 else 72
+        frame_bytes = factor * bitrate * 1000 // sample_rate + padding
+    return mpeg1, layer, bitrate, sample_rate, frame_bytes, channels
+
+
+def _probe_mp3(file_obj: BinaryIO, start: int, size: int) -> AudioInfo | None:
+    file_obj.seek(start)
+    window = file_obj.read(64 * 1024)
+    # Find a frame header confirmed by the header of the frame after it.
+    for pos in range(len(window) - 4):
+        header = _mp3_header(window[pos : pos + 4])
+        if header is None:
+            continue
+        following = window[pos + header[4] : pos + header[4] + 4]
+        if len(following) == 4 and _mp3_header(following) is None:
+            continue
+        break
+    else:
+        return None
+
+    mpeg1, layer, bitrate, sample_rate, _, channels = header
+    samples_per_frame = 384 if layer == 1 else (1152 if mpeg1 or layer == 2 else 576)
+    frame = window[pos : pos + 200]
+    side_info = (32 if channels == 2 else 17) if mpeg1 else (17 if channels == 2 else 9)
+    xing = frame[4 + side_info : 4 + side_info + 16]
+    if xing[:4] in (b"Xing", b"Info") and struct.unpack(">I", xing[4:8])[0] & 0x1:
+        frames = struct.unpack(">I", xing[8:12])[0]
+        return _info("mp3", frames * samples_per_frame / sample_rate, sample_rate, channels)
+    if frame[36:40] == b"VBRI":
+        frames = struct.unpack(">I", frame[50:54])[0]
+        return _info("mp3", frames * samples_per_frame / sample_rate, sample_rate, channels)
+
+    audio_bytes = size - start - pos
+    file_obj.seek(size - 128)
+    if file_obj.read(3) == b"TAG":
+        audio_bytes -= 128
+    return _info("mp3", audio_bytes * 8 / (bitrate * 1000), sample_rate, channels)
+
+
+def _probe_adts(file_obj: BinaryIO, start: int, size: int) -> AudioInfo | None:
+    # No duration field: average the first frames and extrapolate over the file.
+    file_obj.seek(start)
+    frames = total_bytes = sample_rate = channels = 0
+    while frames < ADTS_SAMPLE_FRAMES:
+        header = file_obj.read(7)
+        if len(header) < 7 or header[0] != 0xFF or header[1] & 0xF6 != 0xF0:
+            break
+        rate_index = (header[2] >> 2) & 0xF
+        if rate_index >= len(_AAC_SAMPLE_RATES):
+            return None
+        sample_rate = _AAC_SAMPLE_RATES[rate_index]
+        channels = ((header[2] & 0x1) << 2) | (header[3] >> 6) or channels or 2
+        frame_bytes = ((header[3] & 0x3) << 11) | (header[4] << 3) | (header[5] >> 5)
+        if frame_bytes < 7:
+            break
+        blocks = (header[6] & 0x3) + 1
+        frames += blocks
+        total_bytes += frame_bytes
+        file_obj.seek(frame_bytes - 7, 1)
+    if not frames:
+        return None
+    estimated_frames = frames * (size - start) / total_bytes
+    return _info("aac", estimated_frames * 1024 / sample_rate, sample_rate, channels)
+
+
+def _mp4_boxes(data: bytes, start: int = 0, end: int | None = None) -> list[tuple[bytes, int, int]]:
+    """(type, payload start, payload end) for the boxes in data[start:end]."""
+    boxes: list[tuple[bytes, int, int]] = []
+    pos, end = start, len(data) if end is None else end
+    while pos + 8 <= end:
+        box_size, box_type = struct.unpack(">I4s", data[pos : pos + 8])
+        header = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", data[pos + 8 : pos + 16])[0]
+            header = 16
+        elif box_size == 0:
+            box_size = end - pos
+        if box_size < header:
+            break
+        boxes.append((box_type, pos + header, min(end, pos + box_size)))
+        pos += box_size
+    return boxes
+
+
+def _find_box(data: bytes, path: list[bytes], start: int = 0, end: int | None = None) -> tuple[int, int] | None:
+    for box_type, box_start, box_end in _mp4_boxes(data, start, end):
+        if box_type == path[0]:
+            return (box_start, box_end) if len(path) == 1 else _find_box(data, path[1:], box_start, box_end)
+    return None
+
+
+def _probe_mp4(file_obj: BinaryIO, size: int) -> AudioInfo | None:
+    # Walk top-level boxes by header only; `moov` may sit after a large `mdat`.
+    pos = 0
+    moov = b""
+    while pos + 8 <= size:
+        file_obj.seek(pos)
+        header = file_obj.read(16)
+        box_size, box_type = struct.unpack(">I4s", header[:8])
+        header_len = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", header[8:16])[0]
+            header_len = 16
+        elif box_size == 0:
+            box_size = size - pos
+        if box_size < header_len:
+            return None
+        if box_type == b"moov":
+            if box_size > MP4_MAX_MOOV_BYTES:
+                return None
+            file_obj.seek(pos + header_len)
+            moov = file_obj.read(box_size - header_len)
+            break
+        pos += box_size
+    if not moov:
+        return None
+
+    for box_type, trak_start, trak_end in _mp4_boxes(moov):
+        if box_type != b"trak":
+            continue
+        hdlr = _find_box(moov, [b"mdia", b"hdlr"], trak_start, trak_end)
+        if hdlr is None or moov[hdlr[0] + 8 : hdlr[0] + 12] != b"soun":
+            continue
+        mdhd = _find_box(moov, [b"mdia", b"mdhd"], trak_start, trak_end)
+        if mdhd is None:
+            continue
+        body = moov[mdhd[0] : mdhd[1]]
+        if len(body) < (32 if body[:1] == b"\x01" else 20):
+            continue
+        if body[0] == 1:
+            timescale, duration = struct.unpack(">IQ", body[20:32])
+        else:
+            timescale, duration = struct.unpack(">II", body[12:20])
+        channels = sample_rate = 0
+        stsd = _find_box(moov, [b"mdia", b"minf", b"stbl", b"stsd"], trak_start, trak_end)
+        if stsd is not None:
+            # Full box header (4) + entry count (4), then the first sample entry.
+            entry = moov[stsd[0] + 8 : stsd[1]]
+            if len(entry) >= 36:
+                channels = struct.unpack(">H", entry[24:26])[0]
+                sample_rate = struct.unpack(">I", entry[32:36])[0] >> 16
+        return _info("m4a", duration / timescale, sample_rate or timescale, channels or 2)
+    return None
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from .config import PROFILES_DIR
+
+# Leaf frames of threads that are parked rather than working. Without this the
+# idle pool workers and the event loop's selector would dominate every profile.
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+TOP_FUNCTIONS = 40
+_ID_RE = re.compile(r"^[0-9]{8}_[0-9]{6}_[0-9a-f]{8}$")
+
+
+def _frame_label(code: Any) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples the stacks of every thread in the process at a fixed interval.
+
+    Request work is spread over the event loop, the threadpool running sync
+    endpoints, processing-pool workers and subprocess waits, so the profile
+    covers all threads rather than the one that started it.
+    """
+
+    def __init__(self, interval_ms: int = 5) -> None:
+        self.interval_sec = max(1, interval_ms) / 1000.0
+        self._stacks: Counter[str] = Counter()
+        self._samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._elapsed = time.perf_counter() - self._started
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_sec):
+            self._sample()
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            labels: list[str] = []
+            current: Any = frame
+            while current is not None:
+                labels.append(_frame_label(current.f_code))
+                current = current.f_back
+            labels.append(f"thread:{names.get(ident, ident)}")
+            self._stacks[";".join(reversed(labels))] += 1
+        self._samples += 1
+
+    def folded(self) -> str:
+        """Collapsed stacks ("a;b;c count"), readable by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def top(self, limit: int = TOP_FUNCTIONS) -> list[dict[str, Any]]:
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, count in self._stacks.items():
+            frames = stack.split(";")[1:]  # drop the thread label
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        return [
+            {"function": label, "self": own[label], "total": count}
+            for label, count in total.most_common(limit)
+        ]
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "interval_ms": round(self.interval_sec * 1000, 2),
+            "samples": self._samples,
+            "profiled_ms": round(self._elapsed * 1000, 2),
+            "top": self.top(),
+        }
+
+
+def save_profile(profiler: SamplingProfiler, meta: dict[str, Any], keep: int) -> str:
+    """Write `<id>.json` (metadata + top functions) and `<id>.folded`; returns the id."""
+    PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    (PROFILES_DIR / f"{profile_id}.folded").write_text(profiler.folded(), encoding="utf-8")
+    payload = {"id": profile_id, "created_at": datetime.now().isoformat(timespec="seconds"), **meta, **profiler.summary()}
+    (PROFILES_DIR / f"{profile_id}.json").write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    _prune(keep)
+    return profile_id
+
+
+def _prune(keep: int) -> None:
+    if keep <= 0:
+        return
+    # Ids start with the timestamp, so name order is age order.
+    for stale in sorted(PROFILES_DIR.glob("*.json"))[:-keep]:
+        stale.unlink(missing_ok=True)
+        stale.with_suffix(".folded").unlink(missing_ok=True)
+
+
+def list_profiles(limit: int = 100) -> list[dict[str, Any]]:
+    if not PROFILES_DIR.exists():
+        return []
+    rows: list[dict[str, Any]] = []
+    for path in sorted(PROFILES_DIR.glob("*.json"), reverse=True)[:limit]:
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        payload.pop("top", None)
+        rows.append(payload)
+    return rows
+
+
+def profile_path(profile_id: str, fmt: str) -> Path:
+    """Path of a stored profile; raises LookupError for unknown or malformed ids."""
+    if not _ID_RE.match(profile_id) or fmt not in {"json", "folded"}:
+        raise LookupError(profile_id)
+    path = PROFILES_DIR / f"{profile_id}.{fmt}"
+    if not path.exists():
+        raise LookupError(profile_id)
+    return path
@@ -12,6 +12,13 @@ class ItemType(str, Enum):
     FASTSTORY = "FASTSTORY"
 
 
+class LinkMode(str, Enum):
+    AUTO = "auto"
+    REFLINK = "reflink"
+    HARDLINK = "hardlink"
+    COPY = "copy"
+
+
 class ProcessAudioRequest(BaseModel):
     path: str = Field(..., description="Absolute or project-relative file path")
 
@@ -32,6 +39,7 @@ class DailyBuildRequest(BaseModel):
     date: str = Field(..., description="YYYY-MM-DD")
     teacher_cmd: str
     needs: dict[str, list[int]]
+    link_mode: LinkMode | None = Field(default=None, description="auto|reflink|hardlink|copy; defaults to DAILY_LINK_MODE")
 
 
 class MappingsUpdateRequest(BaseModel):
@@ -1,30 +1,46 @@
 from __future__ import annotations
 
 import json
+import io
 import logging
+import os
 import re
 import shutil
+import sqlite3
+import threading
+import time
 import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import date, datetime
-from pathlib import Path
-from typing import Any
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable, Iterator
 
 from .config import (
     AUDIO_EXTENSIONS,
     DAILY_DIR,
     INBOX_DIR,
-    INBOX_ITEMS_PATH,
     LIBRARY_FASTSTORY_DIR,
     LIBRARY_SENTENCE_DIR,
+    LIBRARY_DIR,
     LIBRARY_VOCAB_DIR,
     MAPPINGS_PATH,
+    MAPPINGS_RECHECK_SEC,
+    ORIGINALS_DIR,
     PROJECT_ROOT,
     TEACHER_CMD_PATH,
     ensure_bootstrap,
     load_runtime_settings,
 )
-from .asr import transcribe_for_scope
+from . import asr_cache, fingerprint, metrics, store
+from .asr import preload_model, transcribe_for_scope
+from .asr_engines import get_engine, set_worker_slot
+from .audio import decode_audio, encode_opus, has_ffmpeg
+from .library_index import LibraryIndex
+from .matcher import SynonymMatcher
+from .probe import safe_probe_audio
 
 TYPE_TO_LIBRARY = {
     "VOCAB": LIBRARY_VOCAB_DIR,
@@ -33,8 +49,32 @@ TYPE_TO_LIBRARY = {
 }
 TYPE_TO_CODE = {"VOCAB": "C", "SENTENCE": "S", "FASTSTORY": "P"}
 TYPE_TO_CN = {"VOCAB": "词汇", "SENTENCE": "句子", "FASTSTORY": "快嘴"}
+LIBRARY_INDEX = LibraryIndex(TYPE_TO_LIBRARY, TYPE_TO_CODE)
+DAILY_MANIFEST_NAME = "_manifest.json"
+# Already-compressed formats gain nothing from deflate; store them as-is.
+ZIP_STORED_EXTENSIONS = {".m4a", ".mp3", ".aac", ".ogg", ".opus", ".flac"}
+ZIP_CHUNK_SIZE = 256 * 1024
+COMPACT_EXTENSIONS = {".ogg", ".opus"}
 logger = logging.getLogger(__name__)
 
+_SCAN_POOL: ThreadPoolExecutor | None = None
+_SCAN_POOL_WORKERS = 0
+_SCAN_POOL_LOCK = threading.Lock()
+_ACTIVE_LOCK = threading.Lock()
+_ACTIVE_PATHS: set[str] = set()
+_ARCHIVE_POOL: ThreadPoolExecutor | None = None
+_ARCHIVE_POOL_WORKERS = 0
+_ARCHIVE_LOCK = threading.Lock()
+_ARCHIVE_STATS = {"queued": 0, "encoded": 0, "skipped": 0, "failed": 0, "source_bytes": 0, "encoded_bytes": 0}
+_MAPPINGS_LOCK = threading.Lock()
+_MAPPINGS_STATE: _MappingsState | None = None
+_MAPPINGS_CHECKED_AT = 0.0
+_MATCHER_LOCK = threading.Lock()
+# (mappings object, content signature, compiled matcher) for mappings dicts that
+# did not come from load_mappings(), e.g. ones built by callers or scripts, so
+# passing the same synonyms again does not recompile the matcher.
+_MATCHER_CACHE: tuple[dict[str, Any], str, SynonymMatcher] | None = None
+
 CN_NUM_MAP = {
     "零": 0,
     "〇": 0,
@@ -52,6 +92,10 @@ CN_NUM_MAP = {
 }
 
 
+class FileBusyError(RuntimeError):
+    """The file is already queued or being processed."""
+
+
 @dataclass
 class TagResult:
     type: str
@@ -62,6 +106,15 @@ class TagResult:
     signals: dict[str, Any]
 
 
+@dataclass(frozen=True)
+class _MappingsState:
+    mappings: dict[str, Any]
+    stat_key: tuple[int, int]
+    type_keywords: dict[str, list[str]]
+    max_index: dict[str, int]
+    matcher: SynonymMatcher
+
+
 def _now_iso() -> str:
     return datetime.now().isoformat(timespec="seconds")
 
@@ -77,23 +130,59 @@ def _to_relative(path: Path) -> str:
         return str(path.resolve())
 
 
-def load_mappings() -> dict[str, Any]:
-    ensure_bootstrap()
-    return json.loads(MAPPINGS_PATH.read_text(encoding="utf-8"))
+def _mappings_stat_key() -> tuple[int, int]:
+    try:
+        st = MAPPINGS_PATH.stat()
+    except FileNotFoundError:
+        ensure_bootstrap(force=True)
+        st = MAPPINGS_PATH.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def _build_mappings_state(mappings: dict[str, Any], stat_key: tuple[int, int]) -> _MappingsState:
+    type_keywords = _type_keywords(mappings)
+    return _MappingsState(
+        mappings=mappings,
+        stat_key=stat_key,
+        type_keywords=type_keywords,
+        max_index={item_type: int(mappings[item_type]["max_index"]) for item_type in TYPE_TO_LIBRARY},
+        matcher=SynonymMatcher(mappings, type_keywords),
+    )
 
 
-def save_mappings(payload: dict[str, Any]) -> None:
-    MAPPINGS_PATH.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+def _mappings_state() -> _MappingsState:
+    global _MAPPINGS_STATE, _MAPPINGS_CHECKED_AT
+    state = _MAPPINGS_STATE
+    if state is not None and time.monotonic() - _MAPPINGS_CHECKED_AT < MAPPINGS_RECHECK_SEC:
+        return state
 
+    with _MAPPINGS_LOCK:
+        ensure_bootstrap()
+        stat_key = _mappings_stat_key()
+        state = _MAPPINGS_STATE
+        if state is None or state.stat_key != stat_key:
+            mappings = json.loads(MAPPINGS_PATH.read_text(encoding="utf-8"))
+            state = _build_mappings_state(mappings, stat_key)
+            _MAPPINGS_STATE = state
+        _MAPPINGS_CHECKED_AT = time.monotonic()
+        return state
 
-def _load_items() -> list[dict[str, Any]]:
-    ensure_bootstrap()
-    raw = INBOX_ITEMS_PATH.read_text(encoding="utf-8")
-    return json.loads(raw) if raw.strip() else []
 
+def load_mappings() -> dict[str, Any]:
+    """Cached contents of mappings.json. The dict is shared between callers: do not mutate it."""
+    return _mappings_state().mappings
 
-def _save_items(items: list[dict[str, Any]]) -> None:
-    INBOX_ITEMS_PATH.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
+
+def save_mappings(payload: dict[str, Any]) -> None:
+    global _MAPPINGS_STATE, _MAPPINGS_CHECKED_AT
+    raw = json.dumps(payload, ensure_ascii=False, indent=2)
+    with _MAPPINGS_LOCK:
+        ensure_bootstrap()
+        tmp_path = MAPPINGS_PATH.with_name(MAPPINGS_PATH.name + ".tmp")
+        tmp_path.write_text(raw, encoding="utf-8")
+        os.replace(tmp_path, MAPPINGS_PATH)
+        _MAPPINGS_STATE = _build_mappings_state(json.loads(raw), _mappings_stat_key())
+        _MAPPINGS_CHECKED_AT = time.monotonic()
 
 
 def _normalize_type(raw_type: str) -> str:
@@ -126,9 +215,15 @@ def _cn_num_to_int(text: str) -> int | None:
     return total
 
 
+def _max_index(item_type: str, mappings: dict[str, Any]) -> int:
+    state = _MAPPINGS_STATE
+    if state is not None and state.mappings is mappings:
+        return state.max_index[item_type]
+    return int(mappings[item_type]["max_index"])
+
+
 def _is_valid_index(item_type: str, index: int, mappings: dict[str, Any]) -> bool:
-    max_index = int(mappings[item_type]["max_index"])
-    return 1 <= index <= max_index
+    return 1 <= index <= _max_index(item_type, mappings)
 
 
 def _resolve_item(item_type: str, index: int, mappings: dict[str, Any]) -> dict[str, Any]:
@@ -140,9 +235,9 @@ def _library_item_dir(item_type: str, index: int, title_zh: str, title_en: str)
     code = TYPE_TO_CODE[item_type]
     prefix = f"{code}{index:02d}_"
 
-    existing = sorted(base.glob(f"{prefix}*"))
-    if existing:
-        return existing[0]
+    existing = LIBRARY_INDEX.folder(item_type, index)
+    if existing is not None:
+        return existing
 
     if item_type == "FASTSTORY":
         raw = title_en or title_zh or f"story_{index:02d}"
@@ -152,21 +247,220 @@ def _library_item_dir(item_type: str, index: int, title_zh: str, title_en: str)
     else:
         folder = base / f"{prefix}{title_zh}({title_en})"
     folder.mkdir(parents=True, exist_ok=True)
+    LIBRARY_INDEX.set_folder(item_type, index, folder)
     return folder
 
 
+def _reserve_take_path(target_dir: Path, ext: str) -> Path:
+    # Parallel workers can archive into the same item within one second, so the
+    # name is claimed with an exclusive create before copying.
+    stamp = _now_stamp()
+    for attempt in range(1000):
+        suffix = f"_{attempt}" if attempt else ""
+        target = target_dir / f"take_{stamp}{suffix}{ext}"
+        try:
+            with target.open("xb"):
+                pass
+        except FileExistsError:
+            continue
+        return target
+    raise FileExistsError(f"Cannot allocate take name in {target_dir}")
+
+
 def _archive_audio(src_path: Path, tag: TagResult, mappings: dict[str, Any], remove_source: bool) -> str:
     target_dir = _library_item_dir(tag.type, tag.index, tag.title_zh, tag.title_en)
     ext = src_path.suffix.lower() or ".m4a"
-    target = target_dir / f"take_{_now_stamp()}{ext}"
+    target = _reserve_take_path(target_dir, ext)
     shutil.copy2(src_path, target)
+    LIBRARY_INDEX.add_take(tag.type, tag.index, target)
 
-    if remove_source and src_path.exists() and src_path.parent.resolve() == INBOX_DIR.resolve():
-        src_path.unlink()
+    if remove_source:
+        _remove_inbox_source(src_path)
 
     return _to_relative(target)
 
 
+@dataclass(frozen=True)
+class _TakeIdentity:
+    sha256: str
+    fingerprint: fingerprint.Fingerprint | None
+    duration_sec: float
+    duplicate: fingerprint.TakeMatch | None
+
+
+def _identify_take(src: Path) -> _TakeIdentity | None:
+    """Hash and fingerprint an incoming file and look for the same recording in the Library.
+
+    The exact hash is tried first so byte-identical uploads are never decoded.
+    Without ffmpeg only exact duplicates are found.
+    """
+    try:
+        sha256 = asr_cache.file_sha256(src)
+        match = fingerprint.find_exact(sha256)
+        if match is not None:
+            return _TakeIdentity(sha256, None, 0.0, match)
+        audio = decode_audio(src)
+        if audio is None:
+            return _TakeIdentity(sha256, None, 0.0, None)
+        take_fp = fingerprint.compute(audio)
+        match = fingerprint.find_similar(take_fp, audio.duration_sec) if take_fp is not None else None
+        return _TakeIdentity(sha256, take_fp, audio.duration_sec, match)
+    except (sqlite3.Error, OSError):
+        logger.warning("Take fingerprinting failed: %s", src, exc_info=True)
+        return None
+
+
+def _register_take(library_path: str, tag: TagResult, record_id: str, identity: _TakeIdentity, duration_sec: float) -> None:
+    target = PROJECT_ROOT / library_path
+    try:
+        # copy2 keeps size and mtime, so the Inbox hash is valid for the take too.
+        asr_cache.remember_file_hash(target, identity.sha256)
+        fingerprint.register(
+            target,
+            tag.type,
+            tag.index,
+            record_id,
+            identity.sha256,
+            identity.duration_sec or duration_sec,
+            identity.fingerprint,
+        )
+    except (sqlite3.Error, OSError):
+        logger.warning("Take index update failed: %s", target, exc_info=True)
+
+
+def _duplicate_link(match: fingerprint.TakeMatch) -> dict[str, Any]:
+    return {"library_path": _to_relative(match.path), **match.to_dict()}
+
+
+def _archive_pool(runtime: Any) -> ThreadPoolExecutor:
+    # Separate from the processing pool so ffmpeg encodes never hold an ASR worker.
+    global _ARCHIVE_POOL, _ARCHIVE_POOL_WORKERS
+    with _ARCHIVE_LOCK:
+        if _ARCHIVE_POOL is None or _ARCHIVE_POOL_WORKERS != runtime.archive_workers:
+            if _ARCHIVE_POOL is not None:
+                _ARCHIVE_POOL.shutdown(wait=False)
+            _ARCHIVE_POOL = ThreadPoolExecutor(max_workers=runtime.archive_workers, thread_name_prefix="archive")
+            _ARCHIVE_POOL_WORKERS = runtime.archive_workers
+        return _ARCHIVE_POOL
+
+
+def _count_archive(field: str, amount: int = 1) -> None:
+    with _ARCHIVE_LOCK:
+        _ARCHIVE_STATS[field] += amount
+
+
+def archive_stats() -> dict[str, Any]:
+    with _ARCHIVE_LOCK:
+        result: dict[str, Any] = dict(_ARCHIVE_STATS)
+    done = result["encoded"] + result["skipped"] + result["failed"]
+    result["pending"] = result["queued"] - done
+    result["ratio"] = round(result["encoded_bytes"] / result["source_bytes"], 4) if result["source_bytes"] else 0.0
+    return result
+
+
+def _schedule_compaction(library_path: str, tag: TagResult, runtime: Any) -> None:
+    """Queue an Opus re-encode of a freshly archived take (ARCHIVE_CODEC=opus).
+
+    Called once the record is stored, so the task can point it at the new file.
+    """
+    if runtime.archive_codec != "opus" or not library_path:
+        return
+    take = PROJECT_ROOT / library_path
+    if take.suffix.lower() in COMPACT_EXTENSIONS or not has_ffmpeg():
+        return
+    _count_archive("queued")
+    _archive_pool(runtime).submit(
+        _compact_take,
+        take,
+        tag.type,
+        tag.index,
+        f"{runtime.archive_opus_kbps}k",
+        runtime.archive_keep_original,
+    )
+
+
+def _compact_take(take: Path, item_type: str, index: int, bitrate: str, keep_original: bool) -> None:
+    try:
+        outcome = _compact_take_file(take, item_type, index, bitrate, keep_original)
+    except Exception:
+        logger.exception("Take compaction failed: %s", take)
+        outcome = "failed"
+    _count_archive(outcome)
+
+
+def _compact_take_file(take: Path, item_type: str, index: int, bitrate: str, keep_original: bool) -> str:
+    if not take.is_file():
+        return "failed"
+    source_bytes = take.stat().st_size
+    encoded = encode_opus(take, bitrate=bitrate)
+    if encoded is None:
+        return "failed"
+    if len(encoded) >= source_bytes:
+        # Already compact (e.g. a low-bitrate AAC forwarded by WeChat).
+        return "skipped"
+
+    target = take.with_suffix(".ogg")
+    with target.open("xb") as file_obj:
+        file_obj.write(encoded)
+    LIBRARY_INDEX.add_take(item_type, index, target)
+    LIBRARY_INDEX.remove_take(item_type, index, take)
+    fingerprint.move(take, target)
+
+    kept: Path | None = None
+    if keep_original:
+        try:
+            kept = ORIGINALS_DIR / take.relative_to(LIBRARY_DIR)
+        except ValueError:
+            kept = ORIGINALS_DIR / take.name
+
+    ratio = round(len(encoded) / source_bytes, 4)
+    archive = {
+        "codec": "opus",
+        "bitrate": bitrate,
+        "source_bytes": source_bytes,
+        "bytes": len(encoded),
+        "ratio": ratio,
+        "original_path": _to_relative(kept) if kept is not None else "",
+    }
+    # Every record pointing at the take follows it, including duplicates linked to it.
+    _relink_take(_to_relative(take), _to_relative(target), archive)
+
+    # The original goes last, once nothing new can pick it; a Daily build or ZIP
+    # that planned with it before the swap falls back to the .ogg.
+    if kept is not None:
+        kept.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(take), kept)
+    else:
+        take.unlink()
+
+    _count_archive("source_bytes", source_bytes)
+    _count_archive("encoded_bytes", len(encoded))
+    metrics.ARCHIVE_BYTES.inc(source_bytes, kind="source")
+    metrics.ARCHIVE_BYTES.inc(len(encoded), kind="encoded")
+    logger.info("Compacted take: %s -> %s ratio=%.3f", take.name, target.name, ratio)
+    return "encoded"
+
+
+def _relink_take(old_path: str, new_path: str, archive: dict[str, Any]) -> None:
+    for record in store.items_referencing(old_path):
+        if record.get("library_path") == old_path:
+            record["library_path"] = new_path
+            record["archive"] = archive
+        duplicate_of = record.get("duplicate_of")
+        if isinstance(duplicate_of, dict) and duplicate_of.get("library_path") == old_path:
+            duplicate_of["library_path"] = new_path
+        record["updated_at"] = _now_iso()
+        store.update_item(record)
+
+
+def _live_take(take: Path) -> Path | None:
+    """`take`, or the Opus file compaction replaced it with after it was picked."""
+    if take.is_file():
+        return take
+    compacted = take.with_suffix(".ogg")
+    return compacted if compacted.is_file() else None
+
+
 def _type_keywords(mappings: dict[str, Any]) -> dict[str, list[str]]:
     global_syn = mappings.get("GLOBAL_SYNONYMS", {})
     return {
@@ -176,6 +470,32 @@ def _type_keywords(mappings: dict[str, Any]) -> dict[str, list[str]]:
     }
 
 
+def _synonym_matcher(mappings: dict[str, Any]) -> SynonymMatcher:
+    """Compiled matcher for `mappings`, rebuilt only when the synonyms change."""
+    global _MATCHER_CACHE
+    state = _MAPPINGS_STATE
+    if state is not None and state.mappings is mappings:
+        return state.matcher
+
+    cached = _MATCHER_CACHE
+    if cached is not None and cached[0] is mappings:
+        return cached[2]
+
+    signature = json.dumps(
+        [mappings.get("GLOBAL_SYNONYMS", {})]
+        + [mappings.get(item_type, {}).get("items", {}) for item_type in TYPE_TO_LIBRARY],
+        ensure_ascii=False,
+    )
+    with _MATCHER_LOCK:
+        cached = _MATCHER_CACHE
+        if cached is not None and cached[1] == signature:
+            matcher = cached[2]
+        else:
+            matcher = SynonymMatcher(mappings, _type_keywords(mappings))
+        _MATCHER_CACHE = (mappings, signature, matcher)
+    return matcher
+
+
 def _infer_tag_from_text(text: str, mappings: dict[str, Any]) -> TagResult:
     s = text.strip()
     lower = s.lower()
@@ -201,31 +521,20 @@ def _infer_tag_from_text(text: str, mappings: dict[str, Any]) -> TagResult:
                 signals=signals,
             )
 
+    hits = _synonym_matcher(mappings).hits(lower)
+
     detected_type: str | None = None
-    for item_type, kws in _type_keywords(mappings).items():
-        for kw in kws:
-            if kw and kw in lower:
-                signals["hit_keywords"].append(kw)
-                detected_type = item_type
-                break
-        if detected_type:
-            break
+    type_hit = next((hit for hit in hits if hit.kind == "type"), None)
+    if type_hit:
+        signals["hit_keywords"].append(type_hit.text)
+        detected_type = type_hit.item_type
 
     title_hit: tuple[str, int, dict[str, Any], str] | None = None
-    for item_type in ("VOCAB", "SENTENCE", "FASTSTORY"):
-        for idx_str, item in mappings[item_type]["items"].items():
-            for syn in item.get("synonyms", []):
-                syn_text = str(syn).strip()
-                if not syn_text or syn_text.isdigit():
-                    continue
-                if syn_text.lower() in lower:
-                    signals["raw_title_forms"].append(syn_text)
-                    title_hit = (item_type, int(idx_str), item, syn)
-                    break
-            if title_hit:
-                break
-        if title_hit:
-            break
+    first_title = next((hit for hit in hits if hit.kind == "title"), None)
+    if first_title:
+        signals["raw_title_forms"].append(first_title.text)
+        item = _resolve_item(first_title.item_type, first_title.index, mappings)
+        title_hit = (first_title.item_type, first_title.index, item, first_title.text)
 
     num_match = re.search(r"(?:第)?([一二三四五六七八九十两0-9]{1,3})(?:类|篇)?", s)
     index: int | None = None
@@ -270,7 +579,21 @@ def _infer_tag_from_text(text: str, mappings: dict[str, Any]) -> TagResult:
     )
 
 
-def process_audio_file(path_value: str) -> dict[str, Any]:
+def process_audio_file(path_value: str, progress: Callable[[str], None] | None = None) -> dict[str, Any]:
+    """Run ASR, tagging and archiving for one file; `progress` receives each stage name."""
+    try:
+        record = _process_audio_file(path_value, progress)
+    except Exception:
+        metrics.FILES_FAILED.inc()
+        raise
+    metrics.FILES_PROCESSED.inc()
+    metrics.TAG_CONFIDENCE.observe(record["tag"]["confidence"])
+    if record["needs_review"]:
+        metrics.FILES_NEEDS_REVIEW.inc()
+    return record
+
+
+def _process_audio_file(path_value: str, progress: Callable[[str], None] | None) -> dict[str, Any]:
     ensure_bootstrap()
     mappings = load_mappings()
     runtime = load_runtime_settings()
@@ -282,17 +605,75 @@ def process_audio_file(path_value: str) -> dict[str, Any]:
     if not src.exists():
         raise FileNotFoundError(str(src))
 
+    record_id = str(uuid.uuid4())
+    info = safe_probe_audio(src)
+    identity: _TakeIdentity | None = None
+    exact: fingerprint.TakeMatch | None = None
+    similar: fingerprint.TakeMatch | None = None
+    if runtime.take_dedup:
+        if progress is not None:
+            progress("dedup")
+        t_dedup_start = time.perf_counter()
+        identity = _identify_take(src)
+        metrics.observe_stage_ms("dedup", (time.perf_counter() - t_dedup_start) * 1000)
+        if identity is not None and identity.duplicate is not None:
+            if identity.duplicate.kind == "exact":
+                exact = identity.duplicate
+            else:
+                similar = identity.duplicate
+        if exact is not None:
+            original = store.get_item(exact.record_id)
+            if original is not None:
+                return _link_duplicate(src, record_id, exact, original)
+
     asr_result, head_text, asr_debug = transcribe_for_scope(
         src,
         runtime,
         scope=runtime.asr_process_scope,
+        on_stage=progress,
+        tag_confidence=lambda text: _infer_tag_from_text(text, mappings).confidence,
+        info=info,
+        probed=True,
     )
+    # The header duration is exact and known up front; ASR only sees the segments
+    # it transcribed (none at all for the head scope's tail or the stub engine).
+    duration_sec = info.duration_sec if info is not None else asr_result.duration_sec
+    for stage, elapsed_ms in asr_debug.get("timing_ms", {}).items():
+        if stage == "total":
+            # A cache hit's total is just the lookup; keep it out of the ASR latency.
+            if asr_debug.get("cache") == "hit":
+                continue
+            stage = "asr_total"
+        metrics.observe_stage_ms(stage, elapsed_ms)
+    if progress is not None:
+        progress("tag")
+    t_tag_start = time.perf_counter()
     tag_source_text = head_text or asr_result.text or src.stem
     tag = _infer_tag_from_text(tag_source_text, mappings)
+    metrics.observe_stage_ms("tag", (time.perf_counter() - t_tag_start) * 1000)
     needs_review = tag.confidence < 0.75
     library_path = ""
+    duplicate_of: dict[str, Any] | None = None
+    if similar is not None:
+        # A fingerprint match may just as well be a second reading of the same text,
+        # which the Daily take1/take2 needs, so it is never dropped automatically:
+        # the file stays in the Inbox for review, with the match as a hint.
+        duplicate_of = _duplicate_link(similar)
+        needs_review = True
     if not needs_review:
-        library_path = _archive_audio(src, tag, mappings, remove_source=True)
+        if progress is not None:
+            progress("archive")
+        t_archive_start = time.perf_counter()
+        if exact is not None:
+            # Indexed take whose record is gone: keep the fresh ASR, still no second copy.
+            duplicate_of = _duplicate_link(exact)
+            library_path = duplicate_of["library_path"]
+            _remove_inbox_source(src)
+        else:
+            library_path = _archive_audio(src, tag, mappings, remove_source=True)
+            if identity is not None:
+                _register_take(library_path, tag, record_id, identity, duration_sec)
+        metrics.observe_stage_ms("archive", (time.perf_counter() - t_archive_start) * 1000)
     logger.info(
         "Processed audio: src=%s engine=%s scope=%s confidence=%.2f type=%s index=%s needs_review=%s",
         src,
@@ -305,11 +686,12 @@ def process_audio_file(path_value: str) -> dict[str, Any]:
     )
 
     record = {
-        "id": str(uuid.uuid4()),
+        "id": record_id,
         "created_at": _now_iso(),
         "updated_at": _now_iso(),
         "src_path": _to_relative(src),
-        "duration_sec": asr_result.duration_sec,
+        "duration_sec": duration_sec,
+        "audio": info.to_dict() if info is not None else None,
         "asr": {
             "engine": asr_result.engine,
             "text": asr_result.text,
@@ -330,10 +712,42 @@ def process_audio_file(path_value: str) -> dict[str, Any]:
         "library_path": library_path,
         "needs_review": needs_review,
     }
+    if duplicate_of is not None:
+        record["duplicate_of"] = duplicate_of
+        metrics.FILES_DUPLICATE.inc(kind=duplicate_of["kind"])
 
-    items = _load_items()
-    items.append(record)
-    _save_items(items)
+    store.append_item(record)
+    if library_path and duplicate_of is None:
+        _schedule_compaction(library_path, tag, runtime)
+    return record
+
+
+def _remove_inbox_source(src: Path) -> None:
+    if src.exists() and src.parent.resolve() == INBOX_DIR.resolve():
+        src.unlink()
+
+
+def _link_duplicate(src: Path, record_id: str, match: fingerprint.TakeMatch, original: dict[str, Any]) -> dict[str, Any]:
+    """Record a byte-identical re-upload of an archived take without transcribing or copying it again."""
+    _remove_inbox_source(src)
+    link = _duplicate_link(match)
+    tag = dict(original.get("tag", {}))
+    tag.update({"type": match.item_type, "index": match.index})
+    logger.info("Duplicate audio: src=%s take=%s kind=%s", src, link["library_path"], match.kind)
+    metrics.FILES_DUPLICATE.inc(kind=match.kind)
+    record = {
+        "id": record_id,
+        "created_at": _now_iso(),
+        "updated_at": _now_iso(),
+        "src_path": _to_relative(src),
+        "duration_sec": original.get("duration_sec", 0.0),
+        "asr": original.get("asr", {}),
+        "tag": tag,
+        "library_path": link["library_path"],
+        "needs_review": False,
+        "duplicate_of": link,
+    }
+    store.append_item(record)
     return record
 
 
@@ -350,29 +764,147 @@ def preview_tag_for_text(text: str) -> dict[str, Any]:
     }
 
 
-def list_recent_items(limit: int = 200) -> list[dict[str, Any]]:
-    items = _load_items()
-    items.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-    return items[:limit]
+def list_recent_items(limit: int = 200, needs_review: bool | None = None) -> list[dict[str, Any]]:
+    ensure_bootstrap()
+    return store.list_items(limit, needs_review=needs_review)
+
+
+def _init_scan_worker(runtime: Any, slots: Iterator[int]) -> None:
+    set_worker_slot(next(slots))
+    try:
+        preload_model(runtime)
+    except Exception:
+        # The failure resurfaces per file, where it is reported in the scan results.
+        logger.exception("Scan worker failed to preload ASR model")
+
+
+def processing_pool(runtime: Any) -> ThreadPoolExecutor:
+    """Warm worker pool shared by inbox scans and background jobs."""
+    global _SCAN_POOL, _SCAN_POOL_WORKERS
+    with _SCAN_POOL_LOCK:
+        workers = get_engine(runtime.asr_engine).pool_workers(runtime)
+        if _SCAN_POOL is None or _SCAN_POOL_WORKERS != workers:
+            if _SCAN_POOL is not None:
+                _SCAN_POOL.shutdown(wait=False)
+                # Each pool numbers its workers 1..N again, so per-slot models are
+                # reused; those of slots the smaller pool no longer has are freed.
+                registry = get_engine(runtime.asr_engine).registry(runtime)
+                if registry is not None:
+                    registry.retire_slots(workers)
+            _SCAN_POOL = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix="scan",
+                initializer=_init_scan_worker,
+                initargs=(runtime, iter(range(1, workers + 1))),
+            )
+            _SCAN_POOL_WORKERS = workers
+        return _SCAN_POOL
+
+
+def warm_processing_pool(runtime: Any) -> None:
+    """Start the pool workers now so each one loads its model before the first job."""
+    if not get_engine(runtime.asr_engine).capabilities.local:
+        return
+    pool = processing_pool(runtime)
+    # The executor adds a thread per submit while none is idle, and workers stay
+    # busy in their initializer (model load + warmup), so this spins up all of them.
+    for _ in range(runtime.scan_workers):
+        pool.submit(lambda: None)
+
+
+def path_key(path_value: str) -> str:
+    path = Path(path_value)
+    if not path.is_absolute():
+        path = PROJECT_ROOT / path_value
+    return str(path.resolve())
+
+
+def claim_path(key: str) -> bool:
+    """Mark a file as in progress; False when a job, the watcher or a scan already has it."""
+    with _ACTIVE_LOCK:
+        if key in _ACTIVE_PATHS:
+            return False
+        _ACTIVE_PATHS.add(key)
+        return True
+
 
+def release_path(key: str) -> None:
+    with _ACTIVE_LOCK:
+        _ACTIVE_PATHS.discard(key)
 
-def scan_inbox() -> dict[str, int]:
+
+@contextmanager
+def exclusive_path(path_value: str) -> Iterator[None]:
+    """Hold a file for synchronous processing; raises FileBusyError when it is taken."""
+    key = path_key(path_value)
+    if not claim_path(key):
+        raise FileBusyError(f"Already queued or being processed: {path_value}")
+    try:
+        yield
+    finally:
+        release_path(key)
+
+
+def _scan_one(file: Path) -> dict[str, Any]:
+    try:
+        with exclusive_path(str(file)):
+            if not file.exists():
+                # A background job archived it after the Inbox was listed.
+                raise FileBusyError(f"Already processed: {file.name}")
+            record = process_audio_file(str(file))
+    except FileBusyError as exc:
+        return {"file": file.name, "status": "skipped", "error": str(exc)}
+    except Exception as exc:
+        logger.exception("Failed to process inbox file: %s", file)
+        return {"file": file.name, "status": "failed", "error": str(exc)}
+    return {
+        "file": file.name,
+        "status": "processed",
+        "id": record["id"],
+        "needs_review": record["needs_review"],
+        "library_path": record["library_path"],
+    }
+
+
+def list_inbox_audio() -> list[Path]:
     ensure_bootstrap()
-    queued = 0
-    processed = 0
-    failed = 0
-    for file in sorted(INBOX_DIR.iterdir()):
-        if not file.is_file():
-            continue
-        if file.suffix.lower() not in AUDIO_EXTENSIONS:
-            continue
-        queued += 1
-        try:
-            process_audio_file(str(file))
-            processed += 1
-        except Exception:
-            failed += 1
-    return {"queued": queued, "processed": processed, "failed": failed}
+    return [
+        file
+        for file in sorted(INBOX_DIR.iterdir())
+        if file.is_file() and file.suffix.lower() in AUDIO_EXTENSIONS
+    ]
+
+
+def _probed_duration_ms(file: Path) -> int:
+    # Only orders the scan; an unreadable file sorts last instead of aborting it.
+    info = safe_probe_audio(file)
+    return info.duration_ms if info is not None else 0
+
+
+def scan_inbox() -> dict[str, Any]:
+    runtime = load_runtime_settings()
+    files = list_inbox_audio()
+
+    workers = get_engine(runtime.asr_engine).pool_workers(runtime)
+    if workers > 1 and len(files) > 1:
+        # Longest first, so one long recording does not start last and hold up
+        # the whole scan while the other workers sit idle.
+        durations = {file: _probed_duration_ms(file) for file in files}
+        files.sort(key=lambda file: durations[file], reverse=True)
+        results = list(processing_pool(runtime).map(_scan_one, files))
+    else:
+        results = [_scan_one(file) for file in files]
+
+    processed = sum(1 for row in results if row["status"] == "processed")
+    skipped = sum(1 for row in results if row["status"] == "skipped")
+    return {
+        "queued": len(files),
+        "processed": processed,
+        "skipped": skipped,
+        "failed": len(results) - processed - skipped,
+        "workers": workers,
+        "results": results,
+    }
 
 
 def relabel_item(item_id: str, item_type: str, index: int, title_zh: str, title_en: str) -> dict[str, Any]:
@@ -382,8 +914,7 @@ def relabel_item(item_id: str, item_type: str, index: int, title_zh: str, title_
     if not _is_valid_index(item_type, index, mappings):
         raise ValueError(f"Invalid index {index} for type {item_type}")
 
-    items = _load_items()
-    target = next((x for x in items if x.get("id") == item_id), None)
+    target = store.get_item(item_id)
     if not target:
         raise LookupError(f"Item not found: {item_id}")
 
@@ -405,7 +936,21 @@ def relabel_item(item_id: str, item_type: str, index: int, title_zh: str, title_
         confidence=1.0,
         signals={"manual_override": True},
     )
-    library_path = _archive_audio(src, tag, mappings, remove_source=True)
+    runtime = load_runtime_settings()
+    identity = _identify_take(src) if runtime.take_dedup else None
+    match = identity.duplicate if identity is not None else None
+    # A review hint from a fingerprint match is settled by the manual label.
+    target.pop("duplicate_of", None)
+    if match is not None and match.kind == "exact" and (match.item_type, match.index) == (item_type, index):
+        # A copy filed under another item is kept: the manual label wins.
+        target["duplicate_of"] = _duplicate_link(match)
+        library_path = target["duplicate_of"]["library_path"]
+        _remove_inbox_source(src)
+        metrics.FILES_DUPLICATE.inc(kind=match.kind)
+    else:
+        library_path = _archive_audio(src, tag, mappings, remove_source=True)
+        if identity is not None:
+            _register_take(library_path, tag, item_id, identity, float(target.get("duration_sec") or 0.0))
 
     target["tag"] = {
         "type": item_type,
@@ -418,43 +963,47 @@ def relabel_item(item_id: str, item_type: str, index: int, title_zh: str, title_
     target["library_path"] = library_path
     target["needs_review"] = False
     target["updated_at"] = _now_iso()
-    _save_items(items)
+    store.update_item(target)
+    if "duplicate_of" not in target:
+        _schedule_compaction(library_path, tag, runtime)
     return {"ok": True, "library_path": library_path}
 
 
-def _find_library_dir_for_index(item_type: str, index: int, mappings: dict[str, Any]) -> Path | None:
-    base = TYPE_TO_LIBRARY[item_type]
-    code = TYPE_TO_CODE[item_type]
-    matches = sorted(base.glob(f"{code}{index:02d}_*"))
-    if matches:
-        return matches[0]
+def _ensure_item_folders(mappings: dict[str, Any]) -> None:
+    # Every item gets its Library folder up front, so users can drop takes in by hand.
+    for item_type in TYPE_TO_LIBRARY:
+        for idx in range(1, _max_index(item_type, mappings) + 1):
+            meta = _resolve_item(item_type, idx, mappings)
+            if meta:
+                _library_item_dir(item_type, idx, meta.get("title_zh", ""), meta.get("title_en", ""))
 
-    meta = _resolve_item(item_type, index, mappings)
-    if not meta:
-        return None
-    candidate = _library_item_dir(item_type, index, meta.get("title_zh", ""), meta.get("title_en", ""))
-    return candidate if candidate.exists() else None
+
+def warm_library_index() -> None:
+    ensure_bootstrap()
+    LIBRARY_INDEX.build()
+    _ensure_item_folders(load_mappings())
+
+
+def rescan_library(apply: bool = True) -> dict[str, Any]:
+    ensure_bootstrap()
+    return LIBRARY_INDEX.rescan(apply=apply)
 
 
 def library_summary() -> list[dict[str, Any]]:
     mappings = load_mappings()
     rows: list[dict[str, Any]] = []
     for item_type in ("VOCAB", "SENTENCE", "FASTSTORY"):
-        max_index = int(mappings[item_type]["max_index"])
-        for idx in range(1, max_index + 1):
+        for idx in range(1, _max_index(item_type, mappings) + 1):
             meta = _resolve_item(item_type, idx, mappings)
-            folder = _find_library_dir_for_index(item_type, idx, mappings)
-            takes: list[Path] = []
-            if folder and folder.exists():
-                takes = sorted(folder.glob("take_*"), reverse=True)
+            take_count, latest_time = LIBRARY_INDEX.take_count(item_type, idx)
             rows.append(
                 {
                     "type": item_type,
                     "index": idx,
                     "title_zh": meta.get("title_zh", ""),
                     "title_en": meta.get("title_en", ""),
-                    "take_count": len(takes),
-                    "latest_time": takes[0].name if takes else "",
+                    "take_count": take_count,
+                    "latest_time": latest_time,
                 }
             )
     return rows
@@ -466,12 +1015,12 @@ def library_takes(item_type: str, index: int) -> dict[str, Any]:
     if not _is_valid_index(item_type, index, mappings):
         raise ValueError(f"Invalid index {index} for type {item_type}")
 
-    folder = _find_library_dir_for_index(item_type, index, mappings)
-    takes: list[dict[str, str]] = []
-    if folder and folder.exists():
-        for file in sorted(folder.glob("take_*"), reverse=True):
-            if file.is_file():
-                takes.append({"name": file.name, "path": _to_relative(file)})
+    folder, names = LIBRARY_INDEX.take_names(item_type, index)
+    if folder is None:
+        return {"type": item_type, "index": index, "takes": []}
+    # One resolve for the folder; per-take paths are plain string joins.
+    folder_rel = _to_relative(folder)
+    takes = [{"name": name, "path": f"{folder_rel}/{name}"} for name in names]
     return {"type": item_type, "index": index, "takes": takes}
 
 
@@ -486,7 +1035,12 @@ def _extract_indices(text: str, pattern: str) -> set[int]:
 
 
 def parse_teacher_command(text: str) -> dict[str, Any]:
-    mappings = load_mappings()
+    needs = _parse_needs(text, load_mappings())
+    TEACHER_CMD_PATH.write_text(text, encoding="utf-8")
+    return {"date": str(date.today()), "needs": needs}
+
+
+def _parse_needs(text: str, mappings: dict[str, Any]) -> dict[str, list[int]]:
     normalized = re.sub(r"\s+", "", text)
     needs = {"SENTENCE": set(), "VOCAB": set(), "FASTSTORY": set()}
 
@@ -529,39 +1083,103 @@ def parse_teacher_command(text: str) -> dict[str, Any]:
             needs["FASTSTORY"].add(idx)
     needs["FASTSTORY"] |= _extract_indices(normalized, r"第([一二三四五六七八九十两0-9]{1,3})篇")
 
-    lower = normalized.lower()
-    for item_type in ("VOCAB", "SENTENCE", "FASTSTORY"):
-        for idx_str, meta in mappings[item_type]["items"].items():
-            for syn in meta.get("synonyms", []):
-                syn_text = str(syn).strip()
-                if not syn_text or syn_text.isdigit():
-                    continue
-                if syn_text and syn_text.lower() in lower:
-                    needs[item_type].add(int(idx_str))
-                    break
+    for hit in _synonym_matcher(mappings).hits(normalized.lower()):
+        if hit.kind == "title":
+            needs[hit.item_type].add(hit.index)
 
     cleaned: dict[str, list[int]] = {}
     for item_type in ("SENTENCE", "VOCAB", "FASTSTORY"):
-        max_index = int(mappings[item_type]["max_index"])
+        max_index = _max_index(item_type, mappings)
         values = sorted(x for x in needs[item_type] if 1 <= x <= max_index)
         cleaned[item_type] = values
+    return cleaned
+
+
+# Linux FICLONE ioctl: share the source extents copy-on-write (btrfs, XFS, ...).
+_FICLONE = 0x40049409
 
-    TEACHER_CMD_PATH.write_text(text, encoding="utf-8")
-    return {"date": str(date.today()), "needs": cleaned}
+
+def _reflink(src: Path, dst: Path) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with src.open("rb") as src_obj, dst.open("wb") as dst_obj:
+            fcntl.ioctl(dst_obj.fileno(), _FICLONE, src_obj.fileno())
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+# Methods `_materialize` may produce for each DAILY_LINK_MODE; anything else is redone.
+_LINK_MODE_METHODS = {
+    "auto": {"reflink", "hardlink", "copy"},
+    "reflink": {"reflink", "copy"},
+    "hardlink": {"hardlink", "copy"},
+    "copy": {"copy"},
+}
+
+
+def _materialize(src: Path, dst: Path, link_mode: str) -> str:
+    """Place `src` at `dst` by reflink, hardlink or copy (in that order of preference)."""
+    # Never write through an existing destination: it may be a hardlink to a Library take.
+    dst.unlink(missing_ok=True)
+    if link_mode in {"auto", "reflink"} and _reflink(src, dst):
+        return "reflink"
+    if link_mode in {"auto", "hardlink"}:
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+    return "copy"
 
 
 def _format_code(item_type: str, index: int) -> str:
     return f"{TYPE_TO_CODE[item_type]}{index:02d}"
 
 
-def build_daily_package(date_str: str, teacher_cmd: str, needs: dict[str, list[int]]) -> dict[str, Any]:
-    mappings = load_mappings()
-    target_date = datetime.strptime(date_str, "%Y-%m-%d")
-    day_dir = DAILY_DIR / target_date.strftime("%Y-%m-%d")
-    day_dir.mkdir(parents=True, exist_ok=True)
+@dataclass
+class _DailyPlan:
+    # (need key such as "VOCAB:7", source take, destination relative to the day folder)
+    entries: list[tuple[str, Path, str]]
+    missing: list[dict[str, Any]]
+    report_lines: list[str]
+
+
+def _distinct_takes(takes: list[Path], count: int) -> list[Path]:
+    """First `count` takes with different content, newest first.
+
+    Only the picked takes are stat-ed and hashed (hashes are cached by size and
+    mtime); a rescan fixes stale entries for good. Uploads are deduplicated at
+    archive time, so this only skips copies archived before that.
+    """
+    picked: list[Path] = []
+    seen: set[str] = set()
+    for take in takes:
+        if len(picked) >= count:
+            break
+        if not take.is_file():
+            continue
+        try:
+            digest = asr_cache.file_sha256(take)
+        except (sqlite3.Error, OSError):
+            digest = str(take)
+        if digest in seen:
+            continue
+        seen.add(digest)
+        picked.append(take)
+    return picked
+
 
+def _plan_daily(target_date: datetime, teacher_cmd: str, needs: dict[str, list[int]], mappings: dict[str, Any]) -> _DailyPlan:
+    """Select the takes for a Daily package and render its report, without touching the day folder."""
+    entries: list[tuple[str, Path, str]] = []
     missing: list[dict[str, Any]] = []
-    copied = 0
     report_lines = [
         f"日期：{target_date.strftime('%Y-%m-%d')}",
         f"老师指令：{teacher_cmd}",
@@ -584,25 +1202,19 @@ def build_daily_package(date_str: str, teacher_cmd: str, needs: dict[str, list[i
 
     for item_type in ("SENTENCE", "VOCAB", "FASTSTORY"):
         indexes = sorted(set(needs.get(item_type, [])))
-        cn_dir = day_dir / TYPE_TO_CN[item_type]
-        cn_dir.mkdir(parents=True, exist_ok=True)
         for idx in indexes:
             if not _is_valid_index(item_type, idx, mappings):
                 continue
             meta = _resolve_item(item_type, idx, mappings)
-            folder = _find_library_dir_for_index(item_type, idx, mappings)
-            takes: list[Path] = []
-            if folder and folder.exists():
-                takes = sorted([p for p in folder.glob("take_*") if p.is_file()], reverse=True)
+            takes = LIBRARY_INDEX.takes(item_type, idx)
 
-            selected = takes[:2]
+            selected = _distinct_takes(takes, 2)
             code = _format_code(item_type, idx)
             for i, src in enumerate(selected, start=1):
                 ext = src.suffix.lower() or ".m4a"
                 dst_name = f"{TYPE_TO_CN[item_type]}_{code}_{meta.get('title_zh', '')}_take{i}{ext}"
                 dst_name = re.sub(r"[\\\\/:*?\"<>|]", "_", dst_name)
-                shutil.copy2(src, cn_dir / dst_name)
-                copied += 1
+                entries.append((f"{item_type}:{idx}", src, f"{TYPE_TO_CN[item_type]}/{dst_name}"))
 
             if len(selected) < 2:
                 missing_count = 2 - len(selected)
@@ -615,11 +1227,230 @@ def build_daily_package(date_str: str, teacher_cmd: str, needs: dict[str, list[i
                     f"- {TYPE_TO_CN[item_type]} {code}：可用 {len(takes)} 条，已打包 2 条 ✓"
                 )
 
+    return _DailyPlan(entries=entries, missing=missing, report_lines=report_lines)
+
+
+def _load_daily_manifest(day_dir: Path) -> dict[str, dict[str, Any]]:
+    path = day_dir / DAILY_MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        logger.warning("Ignoring unreadable Daily manifest: %s", path)
+        return {}
+    return {entry["dst"]: entry for entry in payload.get("entries", []) if entry.get("dst")}
+
+
+def _manifest_entry_current(
+    entry: dict[str, Any] | None, src_rel: str, size: int, mtime_ns: int, dst: Path, link_mode: str
+) -> bool:
+    if entry is None or entry.get("src") != src_rel:
+        return False
+    # A hardlink left by an earlier build would let edits reach the Library take.
+    if entry.get("method") not in _LINK_MODE_METHODS.get(link_mode, {"copy"}):
+        return False
+    if entry.get("size") != size or entry.get("mtime_ns") != mtime_ns:
+        return False
+    try:
+        return dst.stat().st_size == size
+    except FileNotFoundError:
+        return False
+
+
+def build_daily_package(
+    date_str: str,
+    teacher_cmd: str,
+    needs: dict[str, list[int]],
+    link_mode: str | None = None,
+) -> dict[str, Any]:
+    t_start = time.perf_counter()
+    mappings = load_mappings()
+    link_mode = link_mode or load_runtime_settings().daily_link_mode
+    target_date = datetime.strptime(date_str, "%Y-%m-%d")
+    day_dir = DAILY_DIR / target_date.strftime("%Y-%m-%d")
+    day_dir.mkdir(parents=True, exist_ok=True)
+    for item_type in ("SENTENCE", "VOCAB", "FASTSTORY"):
+        (day_dir / TYPE_TO_CN[item_type]).mkdir(parents=True, exist_ok=True)
+
+    plan = _plan_daily(target_date, teacher_cmd, needs, mappings)
+    previous = _load_daily_manifest(day_dir)
+    manifest_entries: list[dict[str, Any]] = []
+    copied = linked = skipped = added = replaced = removed = 0
+
+    wanted: set[str] = set()
+    for need, planned, dst_rel in plan.entries:
+        src = _live_take(planned)
+        if src is None:
+            logger.warning("Daily take vanished while building: %s", planned)
+            continue
+        if src != planned:
+            dst_rel = str(PurePosixPath(dst_rel).with_suffix(src.suffix.lower()))
+        wanted.add(dst_rel)
+        dst = day_dir / dst_rel
+        src_rel = _to_relative(src)
+        try:
+            st = src.stat()
+            old_entry = previous.get(dst_rel)
+            if _manifest_entry_current(old_entry, src_rel, st.st_size, st.st_mtime_ns, dst, link_mode):
+                manifest_entries.append(old_entry)  # type: ignore[arg-type]
+                skipped += 1
+                continue
+            method = _materialize(src, dst, link_mode)
+        except FileNotFoundError:
+            # Replaced by compaction between the check and the copy.
+            logger.warning("Daily take vanished while building: %s", src)
+            wanted.discard(dst_rel)
+            dst.unlink(missing_ok=True)
+            continue
+        if method == "copy":
+            copied += 1
+        else:
+            linked += 1
+        if old_entry is None:
+            added += 1
+        else:
+            replaced += 1
+        manifest_entries.append(
+            {
+                "need": need,
+                "src": src_rel,
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "sha256": asr_cache.file_sha256(src),
+                "dst": dst_rel,
+                "method": method,
+            }
+        )
+
+    for dst_rel in previous:
+        if dst_rel not in wanted:
+            (day_dir / dst_rel).unlink(missing_ok=True)
+            removed += 1
+
     report_path = day_dir / "_report.txt"
-    report_path.write_text("\n".join(report_lines) + "\n", encoding="utf-8")
+    report_path.write_text("\n".join(plan.report_lines) + "\n", encoding="utf-8")
+    (day_dir / DAILY_MANIFEST_NAME).write_text(
+        json.dumps(
+            {
+                "date": target_date.strftime("%Y-%m-%d"),
+                "teacher_cmd": teacher_cmd,
+                "needs": {item_type: sorted(set(needs.get(item_type, []))) for item_type in TYPE_TO_LIBRARY},
+                "built_at": _now_iso(),
+                "entries": manifest_entries,
+            },
+            ensure_ascii=False,
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    metrics.observe_stage_ms("daily_build", (time.perf_counter() - t_start) * 1000)
     return {
         "daily_dir": _to_relative(day_dir),
         "copied": copied,
-        "missing": missing,
+        "linked": linked,
+        "link_mode": link_mode,
+        "skipped": skipped,
+        "added": added,
+        "replaced": replaced,
+        "removed": removed,
+        "missing": plan.missing,
         "report_path": _to_relative(report_path),
     }
+
+
+class _ZipStream(io.RawIOBase):
+    """Write-only sink for ZipFile that hands out what was written so far via drain()."""
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self._buf += data
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+
+def _daily_build_request(day: str) -> tuple[str, dict[str, list[int]] | None] | None:
+    """(teacher command, needs) of the last build for that day; needs is None for old manifests."""
+    path = DAILY_DIR / day / DAILY_MANIFEST_NAME
+    if not path.exists():
+        return None
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    needs = payload.get("needs")
+    return str(payload.get("teacher_cmd", "")), needs if isinstance(needs, dict) else None
+
+
+def iter_daily_zip(date_str: str, teacher_cmd: str | None = None) -> Iterator[bytes]:
+    """Stream a ZIP of the Daily package straight from the Library takes, chunk by chunk.
+
+    Without `teacher_cmd` the command and needs of the last build for that date
+    are used, so the ZIP matches the Daily folder even when the needs were
+    edited before building. A command is only re-parsed when none was stored.
+    """
+    mappings = load_mappings()
+    target_date = datetime.strptime(date_str, "%Y-%m-%d")
+    day = target_date.strftime("%Y-%m-%d")
+    built = _daily_build_request(day)
+    needs: dict[str, list[int]] | None = None
+    if teacher_cmd is None:
+        if built is None:
+            raise LookupError(f"No Daily package built for {date_str}")
+        teacher_cmd, needs = built
+    elif built is not None and built[0] == teacher_cmd:
+        needs = built[1]
+    if needs is None:
+        needs = _parse_needs(teacher_cmd, mappings)
+    plan = _plan_daily(target_date, teacher_cmd, needs, mappings)
+    # Planning runs eagerly so bad input fails before the response starts streaming.
+    return _zip_chunks(day, plan)
+
+
+def _zip_chunks(day: str, plan: _DailyPlan) -> Iterator[bytes]:
+    # The sink cannot seek, so ZipFile writes data descriptors after each entry
+    # and nothing has to be buffered beyond the current chunk.
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, "w") as zf:
+        for _, planned, dst_rel in plan.entries:
+            # Opened before its entry is started, so a take replaced by compaction
+            # meanwhile is swapped for the .ogg or left out, never half-written.
+            src = _live_take(planned)
+            try:
+                if src is None:
+                    raise FileNotFoundError(str(planned))
+                fin = src.open("rb")
+            except FileNotFoundError:
+                logger.warning("Daily take vanished while zipping: %s", planned)
+                continue
+            if src != planned:
+                dst_rel = str(PurePosixPath(dst_rel).with_suffix(src.suffix.lower()))
+            st = os.fstat(fin.fileno())
+            info = zipfile.ZipInfo(f"{day}/{dst_rel}", date_time=time.localtime(st.st_mtime)[:6])
+            info.compress_type = (
+                zipfile.ZIP_STORED if src.suffix.lower() in ZIP_STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            )
+            info.file_size = st.st_size
+            with fin, zf.open(info, "w", force_zip64=st.st_size >= zipfile.ZIP64_LIMIT) as fout:
+                for chunk in iter(lambda: fin.read(ZIP_CHUNK_SIZE), b""):
+                    fout.write(chunk)
+                    data = stream.drain()
+                    if data:
+                        yield data
+            yield stream.drain()
+
+        report = zipfile.ZipInfo(f"{day}/_report.txt", date_time=time.localtime()[:6])
+        report.compress_type = zipfile.ZIP_DEFLATED
+        zf.writestr(report, "\n".join(plan.report_lines) + "\n")
+    yield stream.drain()
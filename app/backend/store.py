@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from typing import Any
+
+from .config import INBOX_DB_PATH, INBOX_ITEMS_PATH, REPORTS_DIR
+
+logger = logging.getLogger(__name__)
+
+_DB_LOCK = threading.Lock()
+_DB: sqlite3.Connection | None = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    needs_review INTEGER NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_created_at ON items(created_at);
+CREATE INDEX IF NOT EXISTS idx_items_needs_review ON items(needs_review, created_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _row(record: dict[str, Any]) -> tuple[str, str, str, int, str]:
+    return (
+        str(record["id"]),
+        str(record.get("created_at", "")),
+        str(record.get("updated_at", "")),
+        1 if record.get("needs_review") else 0,
+        json.dumps(record, ensure_ascii=False),
+    )
+
+
+def _migrate_json(conn: sqlite3.Connection) -> None:
+    done = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+    if done or not INBOX_ITEMS_PATH.exists():
+        return
+
+    raw = INBOX_ITEMS_PATH.read_text(encoding="utf-8")
+    records = json.loads(raw) if raw.strip() else []
+    conn.executemany(
+        "INSERT OR IGNORE INTO items(id, created_at, updated_at, needs_review, payload) VALUES (?, ?, ?, ?, ?)",
+        [_row(record) for record in records if record.get("id")],
+    )
+    conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('json_migrated', ?)", (str(len(records)),))
+    conn.commit()
+    INBOX_ITEMS_PATH.replace(INBOX_ITEMS_PATH.with_name(INBOX_ITEMS_PATH.name + ".migrated"))
+    logger.info("Migrated %s inbox records from %s", len(records), INBOX_ITEMS_PATH)
+
+
+def _db() -> sqlite3.Connection:
+    # Callers hold _DB_LOCK; one connection is shared by every thread.
+    global _DB
+    if _DB is None:
+        REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(INBOX_DB_PATH), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _migrate_json(conn)
+        _DB = conn
+    return _DB
+
+
+def append_item(record: dict[str, Any]) -> None:
+    with _DB_LOCK:
+        conn = _db()
+        conn.execute(
+            "INSERT INTO items(id, created_at, updated_at, needs_review, payload) VALUES (?, ?, ?, ?, ?)",
+            _row(record),
+        )
+        conn.commit()
+
+
+def update_item(record: dict[str, Any]) -> None:
+    item_id, created_at, updated_at, needs_review, payload = _row(record)
+    with _DB_LOCK:
+        conn = _db()
+        cursor = conn.execute(
+            "UPDATE items SET created_at = ?, updated_at = ?, needs_review = ?, payload = ? WHERE id = ?",
+            (created_at, updated_at, needs_review, payload, item_id),
+        )
+        conn.commit()
+    if cursor.rowcount == 0:
+        raise LookupError(f"Item not found: {item_id}")
+
+
+def get_item(item_id: str) -> dict[str, Any] | None:
+    with _DB_LOCK:
+        row = _db().execute("SELECT payload FROM items WHERE id = ?", (item_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def items_referencing(library_path: str) -> list[dict[str, Any]]:
+    """Records whose `library_path` or `duplicate_of.library_path` is this take."""
+    # Substring prefilter on the stored JSON, exact check on the decoded records.
+    needle = json.dumps(library_path, ensure_ascii=False)
+    with _DB_LOCK:
+        rows = _db().execute("SELECT payload FROM items WHERE instr(payload, ?) > 0", (needle,)).fetchall()
+    records: list[dict[str, Any]] = []
+    for row in rows:
+        record = json.loads(row[0])
+        duplicate_of = record.get("duplicate_of")
+        linked = duplicate_of.get("library_path") if isinstance(duplicate_of, dict) else None
+        if library_path in (record.get("library_path"), linked):
+            records.append(record)
+    return records
+
+
+def list_items(limit: int = 200, needs_review: bool | None = None) -> list[dict[str, Any]]:
+    with _DB_LOCK:
+        conn = _db()
+        if needs_review is None:
+            rows = conn.execute(
+                "SELECT payload FROM items ORDER BY created_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT payload FROM items WHERE needs_review = ? ORDER BY created_at DESC LIMIT ?",
+                (1 if needs_review else 0, limit),
+            ).fetchall()
+    return [json.loads(row[0]) for row in rows]
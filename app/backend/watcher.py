@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from .config import AUDIO_EXTENSIONS, INBOX_DIR
+
+logger = logging.getLogger(__name__)
+
+FileKey = tuple[int, int]  # (size, mtime_ns)
+
+
+class InboxWatcher:
+    """Hands each new, fully written Inbox audio file to `submit` exactly once.
+
+    Directory changes are picked up through watchdog (inotify on Linux) when it
+    is installed, with a periodic poll as the fallback and safety net. A file is
+    submitted only after its size and mtime stayed unchanged for `settle_ms`.
+    Files already in the Inbox when the watcher starts are left to manual scans.
+    """
+
+    def __init__(self, submit: Callable[[str], Any], poll_ms: int = 1000, settle_ms: int = 1500) -> None:
+        self._submit = submit
+        self._poll_sec = poll_ms / 1000.0
+        self._settle_sec = settle_ms / 1000.0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._observer: Any = None
+        # path -> (last observed key, monotonic time it was first observed)
+        self._pending: dict[str, tuple[FileKey, float]] = {}
+        self._seen: dict[str, FileKey] = {}
+        self.submitted = 0
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._observer is not None else "polling"
+
+    def _candidates(self) -> dict[str, FileKey]:
+        found: dict[str, FileKey] = {}
+        try:
+            entries = list(INBOX_DIR.iterdir())
+        except FileNotFoundError:
+            return found
+        for file in entries:
+            # Skips in-flight uploads (.upload_*.part) and other hidden files.
+            if file.name.startswith(".") or file.suffix.lower() not in AUDIO_EXTENSIONS:
+                continue
+            try:
+                st = file.stat()
+            except FileNotFoundError:
+                continue
+            if file.is_file():
+                found[str(file)] = (st.st_size, st.st_mtime_ns)
+        return found
+
+    def _tick(self) -> None:
+        now = time.monotonic()
+        current = self._candidates()
+
+        for path in list(self._pending):
+            if path not in current:
+                del self._pending[path]
+        for path in list(self._seen):
+            if path not in current:
+                del self._seen[path]
+
+        for path, key in current.items():
+            if self._seen.get(path) == key:
+                continue
+            pending = self._pending.get(path)
+            if pending is None or pending[0] != key:
+                self._pending[path] = (key, now)
+                continue
+            if now - pending[1] < self._settle_sec:
+                continue
+            del self._pending[path]
+            self._seen[path] = key
+            try:
+                self._submit(path)
+                self.submitted += 1
+                logger.info("Inbox watcher queued %s", Path(path).name)
+            except Exception:
+                logger.exception("Inbox watcher failed to queue %s", path)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._tick()
+            except Exception:
+                logger.exception("Inbox watcher tick failed")
+            # Wake early on filesystem events, but keep polling while files settle.
+            timeout = min(self._poll_sec, max(self._settle_sec, 0.1)) if self._pending else self._poll_sec
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _start_observer(self) -> None:
+        try:
+            from watchdog.events import FileSystemEventHandler  # type: ignore[import-not-found]
+            from watchdog.observers import Observer  # type: ignore[import-not-found]
+        except ImportError:
+            return
+
+        wake = self._wake
+
+        class _Handler(FileSystemEventHandler):  # type: ignore[misc]
+            def on_any_event(self, event: Any) -> None:
+                wake.set()
+
+        observer = Observer()
+        observer.schedule(_Handler(), str(INBOX_DIR), recursive=False)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        INBOX_DIR.mkdir(parents=True, exist_ok=True)
+        self._seen = self._candidates()
+        try:
+            self._start_observer()
+        except Exception:
+            logger.warning("Inbox watcher falling back to polling", exc_info=True)
+            self._observer = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="inbox-watcher", daemon=True)
+        self._thread.start()
+        logger.info("Inbox watcher started (%s) on %s", self.mode, INBOX_DIR)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "running": self._thread is not None,
+            "mode": self.mode,
+            "pending": len(self._pending),
+            "submitted": self.submitted,
+        }
@@ -356,6 +356,16 @@ function initDaily() {
       $("daily-result").textContent = String(e);
     }
   });
+
+  $("btn-download-daily").addEventListener("click", () => {
+    const dateValue = $("daily-date").value;
+    if (!dateValue) {
+      $("daily-result").textContent = "请先选择日期。";
+      return;
+    }
+    // Plain navigation lets the browser save the streamed ZIP as it arrives.
+    window.location.href = `/api/daily/zip?date=${encodeURIComponent(dateValue)}`;
+  });
 }
 
 async function refreshLibrary() {
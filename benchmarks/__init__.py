@@ -0,0 +1,5 @@
+"""Pipeline benchmarks against synthetic vaults.
+
+    python -m benchmarks.run --scales 10,1000,100000 --out bench.json
+    python -m benchmarks.compare base.json bench.json
+"""
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any
+
+
+def _index(report: dict[str, Any], metric: str) -> dict[tuple[int, str], float]:
+    return {
+        (scale["takes"], name): float(stats[metric])
+        for scale in report.get("scales", [])
+        for name, stats in scale.get("results", {}).items()
+        if metric in stats
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports from benchmarks.run.")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--metric", default="median_ms")
+    parser.add_argument("--threshold", type=float, default=1.25, help="head/base ratio counted as a regression")
+    args = parser.parse_args()
+
+    base_report = json.loads(Path(args.base).read_text(encoding="utf-8"))
+    head_report = json.loads(Path(args.head).read_text(encoding="utf-8"))
+    base = _index(base_report, args.metric)
+    head = _index(head_report, args.metric)
+
+    print(f"base {base_report['meta'].get('commit', '?')}  head {head_report['meta'].get('commit', '?')}  ({args.metric})")
+    print(f"{'takes':>8}  {'benchmark':<34}{'base':>12}{'head':>12}{'ratio':>8}")
+    regressions = 0
+    for key in sorted(base.keys() & head.keys()):
+        takes, name = key
+        ratio = head[key] / base[key] if base[key] else float("inf")
+        flag = "  <-- slower" if ratio >= args.threshold else ""
+        regressions += bool(flag)
+        print(f"{takes:>8}  {name:<34}{base[key]:>12.3f}{head[key]:>12.3f}{ratio:>8.2f}{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_SCALES = "10,100,1000,10000,100000"
+
+
+def _stats(samples_ms: list[float], **extra: Any) -> dict[str, Any]:
+    return {
+        "runs": len(samples_ms),
+        "min_ms": round(min(samples_ms), 4),
+        "median_ms": round(statistics.median(samples_ms), 4),
+        "mean_ms": round(statistics.fmean(samples_ms), 4),
+        "max_ms": round(max(samples_ms), 4),
+        **extra,
+    }
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> list[float]:
+    samples: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def run_worker(args: argparse.Namespace) -> dict[str, Any]:
+    """Generate one vault and time every hot path; runs in its own process."""
+    from benchmarks import synth
+
+    started = time.perf_counter()
+    generated = synth.generate_vault(args.takes, args.records, args.synonyms, args.process)
+    generate_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    from app.backend import services
+
+    results: dict[str, Any] = {}
+    results["warm_library_index"] = _stats(_time(services.warm_library_index, args.repeat))
+
+    mappings = services.load_mappings()
+    corpus = synth.tag_corpus(args.corpus)
+    samples = _time(lambda: [services._infer_tag_from_text(text, mappings) for text in corpus], args.repeat)
+    results["infer_tag_from_text"] = _stats(
+        samples,
+        calls_per_run=len(corpus),
+        per_call_us=round(statistics.median(samples) * 1000 / max(1, len(corpus)), 3),
+    )
+
+    needs = services.parse_teacher_command(synth.TEACHER_COMMAND)["needs"]
+    results["parse_teacher_command"] = _stats(
+        _time(lambda: services.parse_teacher_command(synth.TEACHER_COMMAND), args.repeat * 10)
+    )
+
+    results["library_summary"] = _stats(_time(services.library_summary, args.repeat * 4))
+
+    items = [(row["type"], row["index"]) for row in services.library_summary()]
+    samples = _time(lambda: [services.library_takes(item_type, idx) for item_type, idx in items], args.repeat)
+    results["library_takes"] = _stats(samples, calls_per_run=len(items))
+
+    day = "2026-01-15"
+    cold = _time(lambda: services.build_daily_package(day, synth.TEACHER_COMMAND, needs), 1)
+    results["build_daily_package_cold"] = _stats(cold)
+    results["build_daily_package_incremental"] = _stats(
+        _time(lambda: services.build_daily_package(day, synth.TEACHER_COMMAND, needs), args.repeat)
+    )
+
+    inbox = services.list_inbox_audio()
+    if inbox:
+        files = iter(inbox)
+        samples = _time(lambda: services.process_audio_file(str(next(files))), len(inbox))
+        results["process_audio_file"] = _stats(samples)
+
+    results["list_recent_items"] = _stats(_time(lambda: services.list_recent_items(200), args.repeat * 4))
+
+    return {"generated": generated, "generate_ms": generate_ms, "results": results}
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    dirty = subprocess.run(["git", "diff", "--quiet"], cwd=REPO_ROOT).returncode != 0
+    return out.stdout.strip() + ("-dirty" if dirty else "")
+
+
+def _run_scale(takes: int, args: argparse.Namespace) -> dict[str, Any]:
+    tmp = Path(tempfile.mkdtemp(prefix=f"bench_{takes}_"))
+    env = dict(os.environ)
+    env.update(
+        {
+            "HOMEWORK_VAULT_ROOT": str(tmp / "HomeworkVault"),
+            "ASR_ENGINE": "stub",
+            "INBOX_WATCH": "0",
+            "PYTHONPATH": os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH", "")])),
+        }
+    )
+    cmd = [
+        sys.executable,
+        "-m",
+        "benchmarks.run",
+        "--worker",
+        "--takes",
+        str(takes),
+        "--records",
+        str(args.records),
+        "--synonyms",
+        str(args.synonyms),
+        "--process",
+        str(args.process),
+        "--corpus",
+        str(args.corpus),
+        "--repeat",
+        str(args.repeat),
+    ]
+    try:
+        proc = subprocess.run(cmd, cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"benchmark worker failed for takes={takes}:\n{proc.stderr}")
+        return json.loads(proc.stdout)
+    finally:
+        if not args.keep:
+            shutil.rmtree(tmp, ignore_errors=True)
+        else:
+            print(f"kept vault: {tmp}", file=sys.stderr)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark pipeline hot paths against synthetic vaults.")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="comma-separated take counts")
+    parser.add_argument("--records", type=int, default=1000, help="synthetic inbox records per vault")
+    parser.add_argument("--synonyms", type=int, default=20, help="extra synonyms per mappings item")
+    parser.add_argument("--process", type=int, default=20, help="inbox files run through process_audio_file")
+    parser.add_argument("--corpus", type=int, default=200, help="texts per _infer_tag_from_text run")
+    parser.add_argument("--repeat", type=int, default=5, help="base repeat count per measurement")
+    parser.add_argument("--out", default="", help="write JSON here instead of stdout")
+    parser.add_argument("--keep", action="store_true", help="keep the generated vaults")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--takes", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(run_worker(args), sys.stdout, ensure_ascii=False)
+        return 0
+
+    scales = [int(value) for value in args.scales.split(",") if value.strip()]
+    report: dict[str, Any] = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "records": args.records,
+                "synonyms": args.synonyms,
+                "process": args.process,
+                "corpus": args.corpus,
+                "repeat": args.repeat,
+            },
+        },
+        "scales": [],
+    }
+    for takes in scales:
+        print(f"takes={takes} ...", file=sys.stderr)
+        report["scales"].append({"takes": takes, **_run_scale(takes, args)})
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import io
+import json
+import random
+import uuid
+import wave
+from datetime import datetime, timedelta
+from typing import Any
+
+# Imported lazily by the worker after HOMEWORK_VAULT_ROOT points at the synthetic
+# vault, so everything here resolves paths through the app's own config.
+
+ITEM_TYPES = ("VOCAB", "SENTENCE", "FASTSTORY")
+TAKE_EPOCH = datetime(2026, 1, 1, 8, 0, 0)
+
+
+def tiny_wav(duration_sec: float = 0.05) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\x00\x00" * int(16000 * duration_sec))
+    return buf.getvalue()
+
+
+def unique_payload(payload: bytes, n: int) -> bytes:
+    """`payload` with its last two samples set from `n`, so takes are not deduplicated as copies."""
+    return payload[:-4] + (n & 0xFFFFFFFF).to_bytes(4, "little")
+
+
+def synthetic_mappings(synonyms_per_item: int, rng: random.Random) -> dict[str, Any]:
+    """Default 17/15/6 mappings, each item padded with `synonyms_per_item` extra synonyms."""
+    from app.backend.config import build_default_mappings
+
+    mappings = build_default_mappings()
+    for item_type in ITEM_TYPES:
+        for idx_str, item in mappings[item_type]["items"].items():
+            extra = [f"{item_type.lower()}_{idx_str}_syn{n}_{rng.randrange(10**6)}" for n in range(synonyms_per_item)]
+            item["synonyms"] = list(item["synonyms"]) + extra
+    return mappings
+
+
+def generate_vault(takes: int, inbox_records: int, synonyms_per_item: int, process_files: int, seed: int = 7) -> dict[str, Any]:
+    """Populate the configured vault and return what was generated.
+
+    `takes` are spread round-robin over all 38 items; `inbox_records` synthetic
+    records go into the inbox store; `process_files` stub-taggable audio files
+    are left in the Inbox for `process_audio_file`.
+    """
+    from app.backend import services, store
+    from app.backend.config import INBOX_DIR, MAPPINGS_PATH, ensure_bootstrap
+
+    rng = random.Random(seed)
+    ensure_bootstrap(force=True)
+    mappings = synthetic_mappings(synonyms_per_item, rng)
+    MAPPINGS_PATH.write_text(json.dumps(mappings, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    items = [
+        (item_type, idx, meta)
+        for item_type in ITEM_TYPES
+        for idx_str, meta in mappings[item_type]["items"].items()
+        for idx in [int(idx_str)]
+    ]
+    folders = {
+        (item_type, idx): services._library_item_dir(item_type, idx, meta.get("title_zh", ""), meta.get("title_en", ""))
+        for item_type, idx, meta in items
+    }
+
+    payload = tiny_wav()
+    for n in range(takes):
+        item_type, idx, _ = items[n % len(items)]
+        stamp = (TAKE_EPOCH + timedelta(seconds=n)).strftime("%Y%m%d_%H%M%S")
+        (folders[(item_type, idx)] / f"take_{stamp}.wav").write_bytes(unique_payload(payload, n))
+
+    now = datetime.now()
+    for n in range(inbox_records):
+        item_type, idx, meta = items[n % len(items)]
+        created = (now - timedelta(seconds=inbox_records - n)).isoformat(timespec="seconds")
+        confidence = round(rng.uniform(0.3, 1.0), 2)
+        store.append_item(
+            {
+                "id": str(uuid.uuid4()),
+                "created_at": created,
+                "updated_at": created,
+                "src_path": f"HomeworkVault/Inbox/synthetic_{n}.wav",
+                "duration_sec": 0.0,
+                "asr": {"engine": "stub", "text": meta.get("title_zh", ""), "lang": "zh", "segments": []},
+                "tag": {"type": item_type, "index": idx, "confidence": confidence, "signals": {}},
+                "library_path": "",
+                "needs_review": confidence < 0.75,
+            }
+        )
+
+    # The stub engine transcribes the file stem, so these names carry their tag.
+    INBOX_DIR.mkdir(parents=True, exist_ok=True)
+    for n in range(process_files):
+        item_type, idx, meta = items[n % len(items)]
+        label = {"VOCAB": "词汇", "SENTENCE": "句子", "FASTSTORY": "快嘴第"}[item_type]
+        (INBOX_DIR / f"{label}{idx}_{n:04d}.wav").write_bytes(unique_payload(payload, takes + n))
+
+    return {
+        "takes": takes,
+        "inbox_records": inbox_records,
+        "synonyms_per_item": synonyms_per_item,
+        "process_files": process_files,
+        "items": len(items),
+        "mappings_bytes": MAPPINGS_PATH.stat().st_size,
+    }
+
+
+def tag_corpus(size: int, seed: int = 11) -> list[str]:
+    """Transcript-like texts: spoken item names, numbers, titles and filler."""
+    rng = random.Random(seed)
+    templates = [
+        "词汇{n} 今天读{title}",
+        "第{n}类 {title}",
+        "句子{cn} 我们来读一读",
+        "快嘴第{n}篇 A super player",
+        "嗯 老师好 这是{title}",
+        "sentence {n} hello world",
+        "vocab {n} color red blue",
+        "今天的作业 读完了",
+    ]
+    cn_digits = "一二三四五六七八九十"
+    titles = ["颜色", "数量相关", "动物", "水果", "天气"]
+    texts: list[str] = []
+    for _ in range(size):
+        n = rng.randint(1, 17)
+        text = rng.choice(templates).format(n=n, cn=cn_digits[(n - 1) % 10], title=rng.choice(titles))
+        texts.append(text)
+    return texts
+
+
+TEACHER_COMMAND = "今天练习：句子5、句子12，词汇7和词汇十三，快嘴第三篇；另外复习句型2"